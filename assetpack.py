@@ -0,0 +1,101 @@
+"""
+Prebuilt asset pack: every sprite already scaled to its in-game size and
+stored as raw BGRA pixels (the byte order of the usual 32-bit display
+format) in one file, so startup maps the file instead of decoding and
+shrinking 1024px PNGs.
+
+Layout (little-endian):
+
+    b"SNKA" u16 version u16 count
+    count x (u8 name_len, name, u16 width, u16 height, u32 offset)
+    pixel data, width * height * 4 bytes per entry at its offset
+
+The pack is only used while it is newer than every source image, so a
+stale one is ignored rather than shown. Rebuild with:
+
+    python assetpack.py
+"""
+
+import mmap
+import os
+import struct
+
+import pygame
+
+MAGIC = b"SNKA"
+VERSION = 1
+PIXEL_FORMAT = "BGRA"
+DEFAULT_PATH = "assets.pack"
+
+
+def build(path, entries):
+    """
+    Writes a pack. entries maps name -> (image file, (width, height) to
+    scale to, (x, y, width, height) to cut out, or None to keep the image
+    as it is).
+    """
+    images = []
+    for name, (file_name, size) in entries.items():
+        surf = pygame.image.load(file_name)
+        if size is not None and len(size) == 4:
+            surf = surf.subsurface(pygame.Rect(size).clip(surf.get_rect()))
+        elif size is not None and surf.get_size() != size:
+            # Same filter as the sprite atlas, so packed sprites match
+            surf = pygame.transform.scale(surf, size)
+        images.append(
+            (name.encode(), surf.get_size(), pygame.image.tobytes(surf, PIXEL_FORMAT))
+        )
+
+    header = struct.pack("<4sHH", MAGIC, VERSION, len(images))
+    index_size = sum(1 + len(name) + 8 for name, _, _ in images)
+    offset = len(header) + index_size
+    index = b""
+    for name, (w, h), pixels in images:
+        index += struct.pack("<B", len(name)) + name + struct.pack("<HHI", w, h, offset)
+        offset += len(pixels)
+    with open(path, "wb") as f:
+        f.write(header + index)
+        for _, _, pixels in images:
+            f.write(pixels)
+
+
+def is_fresh(path, sources):
+    """True if the pack exists and is newer than every source file."""
+    try:
+        built = os.path.getmtime(path)
+        return all(os.path.getmtime(src) <= built for src in sources)
+    except OSError:
+        return False
+
+
+def load(path):
+    """
+    Maps the pack and returns {name: Surface}. The surfaces are views onto
+    the mapping; callers convert() them, which copies the pixels out.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count = struct.unpack_from("<4sHH", data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} asset pack")
+    pos = 8
+    surfaces = {}
+    view = memoryview(data)
+    for _ in range(count):
+        name_len = data[pos]
+        name = bytes(data[pos + 1 : pos + 1 + name_len]).decode()
+        pos += 1 + name_len
+        w, h, offset = struct.unpack_from("<HHI", data, pos)
+        pos += 8
+        pixels = view[offset : offset + w * h * 4]
+        surfaces[name] = pygame.image.frombuffer(pixels, (w, h), PIXEL_FORMAT)
+    return surfaces
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import main
+
+    build(main.ASSET_PACK, main.asset_pack_entries())
+    print(f"Wrote {main.ASSET_PACK} ({os.path.getsize(main.ASSET_PACK):,} bytes)")
@@ -0,0 +1,443 @@
+"""
+Autopilot: steers the snake to food while keeping clear of bombs, rocks
+and its own body.
+
+Paths are found with A* over packed cell indexes (y * width + x), using
+buffers allocated once per board and told apart between searches by a
+generation stamp, so a search never clears anything. The body is not a
+fixed wall: segment i moves off its cell len - i ticks from now, so a
+cell counts as free if the path reaches it after that. While the star's
+wrap mode will still be on, paths may go through the edges.
+
+A path to food is only taken if the tail is still reachable from the
+food afterwards (checked on the body as it will be then); otherwise the
+snake follows its tail and tries again next tick. A path is replanned
+only when it can no longer be trusted: the snake went somewhere else,
+the target went away, a bomb or rock came or went, or wrap mode changed.
+Every other tick just takes the next cell of the stored path.
+
+Usage: python autopilot.py [games] [WxH]   plays headless games and
+reports how long each decision took.
+"""
+
+import heapq
+import sys
+import time
+from array import array
+
+import engine
+
+# Entities the snake must not enter
+AVOID = frozenset(("bomb", "rock"))
+# Cells all the searches of one decision may expand between them (about
+# 2 ms), so no board can make a decision take a sizeable part of a 10 ms
+# tick. Once it runs out, the move is picked greedily instead
+SEARCH_BUDGET = 1_000
+# What _search returns when the budget ran out before it could tell
+EXHAUSTED = -2
+# Headless games from the command line stop after this many ticks
+MAX_TICKS = 100_000
+
+
+class Autopilot:
+    """
+    Call it before every tick with the GameState; it returns the direction
+    to turn (or None). Fits tournament.py as a policy too.
+    """
+
+    def __init__(self, targets=("apple",)):
+        self.targets = tuple(targets)
+        self.width = 0
+        self.height = 0
+        self.gen = 0
+        # Remaining cells of the current plan, next move last
+        self.path = []
+        self.plan_key = None
+        self.chasing = False
+        # Ticks spent chasing the tail since food was last in reach
+        self.hungry = 0
+        self.next_head = -1
+        # Whether the tail is known to be reachable at the end of path
+        self.verified = True
+        self.expanded = 0
+        self.budget = SEARCH_BUDGET
+
+    def reset(self):
+        """Forgets the current plan; call it when a new run starts."""
+        self.path = []
+        self.chasing = False
+        self.hungry = 0
+        self.next_head = -1
+        self.verified = True
+
+    def _allocate(self, width, height):
+        cells = width * height
+        self.width = width
+        self.height = height
+        self.seen = array("I", [0]) * cells
+        self.cost = array("i", [0]) * cells
+        self.parent = array("i", [0]) * cells
+        self.body_gen = array("I", [0]) * cells
+        self.body_free = array("i", [0]) * cells
+        self.gen = 0
+        self.reset()
+
+    # --- Search ---
+    def _load_body(self, cells, pending_growth):
+        """
+        Marks the body (head first) for the next search: segment i blocks
+        its cell for the first len - i moves, one more with growth pending.
+        """
+        self.gen += 1
+        gen = self.gen
+        body_gen = self.body_gen
+        body_free = self.body_free
+        remaining = len(cells) + pending_growth
+        for cell in cells:
+            body_gen[cell] = gen
+            body_free[cell] = remaining
+            remaining -= 1
+
+    def _search(self, entities, start, goals, wrap_ticks, behind=-1):
+        """
+        A* from start to the nearest of goals on the loaded body. Returns
+        the goal reached, -1 if there is no way, or EXHAUSTED if the
+        decision's search budget ran out first. behind is a cell the first
+        move can't enter (a length-1 snake still can't reverse). With several goals there is no
+        distance estimate and it searches breadth first.
+        """
+        w, h = self.width, self.height
+        last_x, last_y = w - 1, h - 1
+        gen = self.gen
+        seen, cost, parent = self.seen, self.cost, self.parent
+        body_gen, body_free = self.body_gen, self.body_free
+        goal_set = set(goals)
+        guided = len(goals) == 1
+        gx, gy = goals[0] % w, goals[0] // w
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        seen[start] = gen
+        cost[start] = 0
+        parent[start] = -1
+        # Entries are (cost + estimate, -cost, cell): ties go to the deeper
+        # node, which keeps heading for the goal instead of fanning out
+        heap = [(0, 0, start)]
+        expansions = 0
+        budget = self.budget
+        self.expanded = 0
+        while heap:
+            _, g, cell = heappop(heap)
+            g = -g
+            if g != cost[cell]:
+                continue
+            if cell in goal_set:
+                self.budget -= expansions
+                return cell
+            if expansions == budget:
+                self.budget = 0
+                return EXHAUSTED
+            expansions += 1
+            self.expanded = expansions
+            x, y = cell % w, cell // w
+            ng = g + 1
+            wrap = ng <= wrap_ticks
+            for n in (
+                cell + 1 if x < last_x else (cell - last_x if wrap else -1),
+                cell - 1 if x > 0 else (cell + last_x if wrap else -1),
+                cell + w if y < last_y else (x if wrap else -1),
+                cell - w if y > 0 else (last_y * w + x if wrap else -1),
+            ):
+                if n < 0:
+                    continue
+                if seen[n] == gen and cost[n] <= ng:
+                    continue
+                if body_gen[n] == gen and ng <= body_free[n]:
+                    continue
+                if n == behind and g == 0:
+                    continue
+                hit = entities[n]
+                if hit is not None and hit.kind in AVOID:
+                    continue
+                seen[n] = gen
+                cost[n] = ng
+                parent[n] = cell
+                estimate = 0
+                if guided:
+                    dx = n % w - gx
+                    dy = n // w - gy
+                    if dx < 0:
+                        dx = -dx
+                    if dy < 0:
+                        dy = -dy
+                    if wrap:
+                        if w - dx < dx:
+                            dx = w - dx
+                        if h - dy < dy:
+                            dy = h - dy
+                    estimate = dx + dy
+                heappush(heap, (ng + estimate, -ng, n))
+        self.budget -= expansions
+        return -1
+
+    def _trace(self, goal):
+        """The path to goal from the last search, goal first."""
+        path = []
+        parent = self.parent
+        cell = goal
+        while parent[cell] != -1:
+            path.append(cell)
+            cell = parent[cell]
+        return path
+
+    # --- Planning ---
+    @staticmethod
+    def wrap_ticks(game):
+        """How many of the coming moves will still wrap at the edges."""
+        left = game.star_end_time - game.last_move_time
+        if left <= 0:
+            return 0
+        # Move k lands at last_move_time + k * move_delay
+        return max(0, -(-left // game.move_delay) - 1)
+
+    def _tail_reachable(self, game, path, wrap_ticks):
+        """
+        Whether the tail can still be reached after following path, or
+        None if the search budget ran out before that was known.
+        """
+        snake = game.snake
+        moves = len(path)
+        grows = 1 if game.board.entities[path[0]].kind == "apple" else 0
+        # The body once the path is walked: the path (newest first), then
+        # whatever is left of the current body
+        length = len(snake.body) + (1 if snake.grow else 0)
+        cells = path[:length]
+        cells.extend(list(snake.body)[: max(0, length - moves)])
+        self._load_body(cells, grows)
+        if len(cells) == 1:
+            return True
+        tail = cells[-1]
+        entities = game.board.entities
+        found = self._search(entities, path[0], [tail], wrap_ticks - moves)
+        if found == EXHAUSTED:
+            return None
+        return found >= 0
+
+    def _plan_key(self, game, goal):
+        # What a stored path was planned against; it holds while this does
+        snake = game.snake
+        return (
+            game.static_version,
+            snake.wrap_mode,
+            len(snake.body),
+            game.board.entities[goal],
+        )
+
+    def _plan(self, game, head, behind, wrap_ticks, chase_valid):
+        board = game.board
+        w = self.width
+        goals = [
+            item.position[1] * w + item.position[0]
+            for item in (getattr(game, name) for name in self.targets)
+            if item.active
+        ]
+        snake = game.snake
+        if goals:
+            self._load_body(snake.body, 1 if snake.grow else 0)
+            goal = self._search(board.entities, head, goals, wrap_ticks, behind)
+            if goal >= 0:
+                path = self._trace(goal)
+                # Circling without ever finding a safe way in: go anyway
+                starving = self.hungry > board.width * board.height
+                reachable = starving or self._tail_reachable(game, path, wrap_ticks)
+                if reachable is not False:
+                    # Out of budget for the tail check: the first move is
+                    # safe, and the check is finished on the next tick
+                    self.path = path
+                    self.chasing = False
+                    self.verified = reachable is True
+                    self.plan_key = self._plan_key(game, goal)
+                    return path.pop()
+        # No safe way to food yet: chase the tail, which keeps space open.
+        # Each move is checked on its own, keeping the tail reachable one
+        # tick at a time; the path it came from is kept as the first choice
+        preferred = self.path[-1] if chase_valid else -1
+        if not chase_valid:
+            self.path = []
+            self._load_body(snake.body, 1 if snake.grow else 0)
+            goal = self._search(
+                board.entities, head, [snake.body[-1]], wrap_ticks, behind
+            )
+            if goal >= 0 and goal != head:
+                self.path = self._trace(goal)
+                self.chasing = True
+                self.plan_key = self._plan_key(game, goal)
+                preferred = self.path[-1]
+        step = self._safe_step(game, head, behind, wrap_ticks, preferred)
+        if self.path and step == self.path[-1]:
+            self.path.pop()
+        else:
+            self.path = []
+        return step
+
+    def _safe_step(self, game, head, behind, wrap_ticks, preferred):
+        """
+        A neighbouring cell after which the tail is still reachable,
+        trying preferred first; failing that any cell that doesn't kill
+        the snake on the spot, or -1. Without search budget left it keeps
+        to preferred, or picks the one nearest the food.
+        """
+        board = game.board
+        snake = game.snake
+        w, h = self.width, self.height
+        x, y = head % w, head // w
+        counts = board.counts
+        options = []
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if not (0 <= nx < w and 0 <= ny < h):
+                if wrap_ticks <= 0:
+                    continue
+                nx %= w
+                ny %= h
+            n = ny * w + nx
+            hit = board.entities[n]
+            if n == behind or (counts[n] and hit is None):
+                continue
+            if hit is not None and hit.kind in AVOID:
+                continue
+            options.append(n)
+        if preferred in options:
+            options.remove(preferred)
+            options.insert(0, preferred)
+        length = len(snake.body) + (1 if snake.grow else 0)
+        body = list(snake.body)[: length - 1]
+        # Failing that, whichever leaves the most room: a failed search
+        # has expanded every cell it could reach
+        roomiest = -1
+        most_room = -1
+        for n in options:
+            if not body:
+                return n
+            if not self.budget:
+                if n == preferred:
+                    return n
+                return self._nearest_food(game, options, wrap_ticks)
+            hit = board.entities[n]
+            grows = 1 if hit is not None and hit.kind == "apple" else 0
+            self._load_body([n] + body, grows)
+            found = self._search(board.entities, n, [body[-1]], wrap_ticks - 1)
+            if found >= 0 or found == EXHAUSTED:
+                # Running out of budget means n had room for all of it
+                return n
+            if self.budget and self.expanded > most_room:
+                roomiest = n
+                most_room = self.expanded
+        return roomiest
+
+    def _nearest_food(self, game, options, wrap_ticks):
+        """The greedy fallback: whichever of options is closest to food."""
+        w, h = self.width, self.height
+        foods = [
+            item.position
+            for item in (getattr(game, name) for name in self.targets)
+            if item.active
+        ]
+        if not foods:
+            return options[0]
+
+        def distance(cell):
+            x, y = cell % w, cell // w
+            best = None
+            for fx, fy in foods:
+                dx, dy = abs(x - fx), abs(y - fy)
+                if wrap_ticks > 0:
+                    dx, dy = min(dx, w - dx), min(dy, h - dy)
+                if best is None or dx + dy < best:
+                    best = dx + dy
+            return best
+
+        return min(options, key=distance)
+
+    def __call__(self, game, rng=None):
+        snake = game.snake
+        if not snake.alive:
+            return None
+        self.budget = SEARCH_BUDGET
+        board = game.board
+        if (board.width, board.height) != (self.width, self.height):
+            self._allocate(board.width, board.height)
+        w = self.width
+        head = snake.body[0]
+        hx, hy = head % w, head // w
+        dx, dy = snake.direction
+        behind = -1
+        if len(snake.body) == 1:
+            behind = ((hy - dy) % self.height) * w + (hx - dx) % w
+
+        path = self.path
+        valid = (
+            bool(path)
+            and self.next_head == head
+            and self.plan_key == self._plan_key(game, path[0])
+        )
+        if self.chasing:
+            self.hungry += 1
+        else:
+            self.hungry = 0
+        wrap_ticks = self.wrap_ticks(game)
+        if valid and not self.chasing and not self.verified:
+            # The tail check ran out of budget when this path was planned;
+            # the body at the end of it is the same now, so finish it here
+            reachable = self._tail_reachable(game, path, wrap_ticks)
+            self.verified = reachable is True
+            valid = reachable is not False
+        if valid and not self.chasing:
+            step = path.pop()
+        else:
+            step = self._plan(game, head, behind, wrap_ticks, valid)
+        if step < 0:
+            self.path = []
+            return None
+        self.next_head = step
+        dx, dy = step % w - hx, step // w - hy
+        # A move through the edge looks like a jump across the board
+        if dx > 1:
+            dx = -1
+        elif dx < -1:
+            dx = 1
+        if dy > 1:
+            dy = -1
+        elif dy < -1:
+            dy = 1
+        return dx, dy
+
+
+def main(games, width, height):
+    pilot = Autopilot()
+    decisions = []
+    for seed in range(games):
+        pilot.reset()
+        game = engine.GameState(seed=seed, width=width, height=height)
+        for _ in range(MAX_TICKS):
+            started = time.perf_counter()
+            action = pilot(game)
+            decisions.append(time.perf_counter() - started)
+            game.step(action)
+            if not game.snake.alive:
+                break
+        print(f"seed {seed}: score {game.score}, length {len(game.snake.body)}")
+    decisions.sort()
+    p50 = decisions[len(decisions) // 2] * 1000
+    p99 = decisions[int(len(decisions) * 0.99)] * 1000
+    print(
+        f"{len(decisions)} decisions: p50 {p50:.3f} ms, p99 {p99:.3f} ms, "
+        f"max {decisions[-1] * 1000:.3f} ms (a tick is {engine.MIN_MOVE_DELAY:g} ms "
+        "at top speed)"
+    )
+
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    width, height = engine.GRID_WIDTH, engine.GRID_HEIGHT
+    if len(sys.argv) > 2:
+        width, height = (int(n) for n in sys.argv[2].split("x"))
+    main(games, width, height)
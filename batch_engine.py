@@ -0,0 +1,316 @@
+import sys
+import time
+
+import numpy as np
+
+import engine
+
+# Action codes, in the same order as engine.DIRECTIONS. NO_TURN keeps going straight.
+NO_TURN = -1
+ACTION_UP = 0
+ACTION_DOWN = 1
+ACTION_LEFT = 2
+ACTION_RIGHT = 3
+
+_DX = np.array([d[0] for d in engine.DIRECTIONS], dtype=np.int32)
+_DY = np.array([d[1] for d in engine.DIRECTIONS], dtype=np.int32)
+_OPPOSITE = np.array([ACTION_DOWN, ACTION_UP, ACTION_RIGHT, ACTION_LEFT], dtype=np.int8)
+
+NO_CELL = -1
+
+
+class BatchGame:
+    """
+    N independent boards advanced in lockstep by one vectorized step().
+
+    Follows the rules of engine.GameState (apple, cookie, banana, star,
+    bombs, rocks, wrap mode) but keeps every board in flat NumPy arrays.
+    Cells are packed as y * width + x. Each snake body is a ring buffer of
+    cells (head at head_ptr, length cells long) with a matching occupancy
+    count grid, so moves, growth, shrinking and collision checks are all
+    plain array ops. Items are placed by picking a random free cell rather
+    than by rejection sampling, so the random stream differs from the
+    scalar engine even with the same seed; the rules do not.
+    """
+
+    def __init__(
+        self, n, width=engine.GRID_WIDTH, height=engine.GRID_HEIGHT, seed=None
+    ):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.rng = np.random.default_rng(seed)
+        self._rows = np.arange(n)
+
+        # Snake
+        self.body = np.zeros((n, self.cells), dtype=np.int32)
+        self.head_ptr = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.occupancy = np.zeros((n, self.cells), dtype=np.int8)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.grow = np.zeros(n, dtype=bool)
+        self.alive = np.zeros(n, dtype=bool)
+
+        # Items (NO_CELL when inactive)
+        self.apple = np.full(n, NO_CELL, dtype=np.int32)
+        self.cookie = np.full(n, NO_CELL, dtype=np.int32)
+        self.banana = np.full(n, NO_CELL, dtype=np.int32)
+        self.star = np.full(n, NO_CELL, dtype=np.int32)
+        self.bombs = np.zeros((n, self.cells), dtype=bool)
+        self.rocks = np.zeros((n, self.cells), dtype=bool)
+
+        # Counters and timers (milliseconds on a per-board logical clock)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.move_delay = np.zeros(n, dtype=np.float64)
+        self.apples_eaten_count = np.zeros(n, dtype=np.int32)
+        self.rock_milestone = np.zeros(n, dtype=np.int64)
+        self.now = np.zeros(n, dtype=np.float64)
+        self.star_end_time = np.zeros(n, dtype=np.float64)
+
+        self.reset()
+
+    # --- Helpers ---
+    def head(self):
+        return self.body[self._rows, self.head_ptr]
+
+    def blocked(self, rows):
+        """Cells taken by the snake, any item, bomb or rock for the given boards."""
+        blocked = (self.occupancy[rows] > 0) | self.bombs[rows] | self.rocks[rows]
+        local = np.arange(rows.size)
+        for item in (self.apple, self.cookie, self.banana, self.star):
+            cell = item[rows]
+            has = cell != NO_CELL
+            blocked[local[has], cell[has]] = True
+        return blocked
+
+    def _pick_free(self, blocked):
+        """One uniformly random free cell per row, or NO_CELL if the row is full."""
+        keys = self.rng.random(blocked.shape)
+        keys[blocked] = -1.0
+        choice = keys.argmax(axis=1).astype(np.int32)
+        full = keys[np.arange(choice.size), choice] < 0.0
+        choice[full] = NO_CELL
+        return choice
+
+    def _spawn(self, item, rows, blocked):
+        # Like Item.spawn_random, an item keeps its old state if nothing is free
+        cell = self._pick_free(blocked)
+        ok = cell != NO_CELL
+        item[rows[ok]] = cell[ok]
+        blocked[np.flatnonzero(ok), cell[ok]] = True
+
+    def _spawn_bomb(self, rows, blocked):
+        cell = self._pick_free(blocked)
+        ok = cell != NO_CELL
+        self.bombs[rows[ok], cell[ok]] = True
+        blocked[np.flatnonzero(ok), cell[ok]] = True
+
+    def _spawn_rock(self, rows, blocked):
+        w, h = self.width, self.height
+        grid = blocked.reshape(-1, h, w)
+        corner_blocked = np.ones_like(grid)
+        corner_blocked[:, : h - 1, : w - 1] = (
+            grid[:, :-1, :-1] | grid[:, :-1, 1:] | grid[:, 1:, :-1] | grid[:, 1:, 1:]
+        )
+        corner = self._pick_free(corner_blocked.reshape(-1, self.cells))
+        ok = corner != NO_CELL
+        local = np.flatnonzero(ok)
+        for offset in (0, 1, w, w + 1):
+            cells = corner[ok] + offset
+            self.rocks[rows[ok], cells] = True
+            blocked[local, cells] = True
+
+    # --- Public API ---
+    def reset(self, mask=None):
+        rows = self._rows if mask is None else np.flatnonzero(mask)
+        if rows.size == 0:
+            return
+        w = self.width
+        cx, cy = self.width // 2, self.height // 2
+        start = np.array([cy * w + cx - i for i in range(4)], dtype=np.int32)
+
+        self.occupancy[rows] = 0
+        self.body[rows, :4] = start
+        self.occupancy[rows[:, None], start[None, :]] = 1
+        self.head_ptr[rows] = 0
+        self.length[rows] = 4
+        self.direction[rows] = ACTION_RIGHT
+        self.grow[rows] = False
+        self.alive[rows] = True
+
+        self.cookie[rows] = NO_CELL
+        self.banana[rows] = NO_CELL
+        self.star[rows] = NO_CELL
+        self.apple[rows] = NO_CELL
+        self.bombs[rows] = False
+        self.rocks[rows] = False
+
+        self.score[rows] = 0
+        self.move_delay[rows] = engine.START_MOVE_DELAY
+        self.apples_eaten_count[rows] = 0
+        self.rock_milestone[rows] = engine.SCORE_FOR_ROCK
+        self.now[rows] = 0.0
+        self.star_end_time[rows] = 0.0
+
+        self._spawn(self.apple, rows, self.blocked(rows))
+
+    def step(self, actions=None):
+        """
+        Advances every live board by one logic tick.
+
+        `actions` is an int array of length n holding ACTION_* codes or
+        NO_TURN. Returns (rewards, done): the score gained this tick and a
+        mask of boards that died this tick. Dead boards stay frozen until
+        reset() is called for them.
+        """
+        w, h, cap = self.width, self.height, self.cells
+        live = self.alive.copy()
+        score_before = self.score.copy()
+
+        self.now[live] += self.move_delay[live]
+        wrap = self.now < self.star_end_time
+
+        # Turning (reversing into the neck is ignored)
+        if actions is not None:
+            actions = np.asarray(actions, dtype=np.int8)
+            turn = live & (actions >= 0)
+            turn &= actions != _OPPOSITE[self.direction]
+            self.direction[turn] = actions[turn]
+
+        # Movement
+        head = self.head()
+        x = head % w + _DX[self.direction]
+        y = head // w + _DY[self.direction]
+        off_board = (x < 0) | (x >= w) | (y < 0) | (y >= h)
+        crashed = live & off_board & ~wrap
+        x %= w
+        y %= h
+        new_head = y * w + x
+        crashed |= live & ~crashed & (self.occupancy[self._rows, new_head] > 0)
+
+        moving = live & ~crashed
+        rows = np.flatnonzero(moving)
+        cells = new_head[rows]
+        ptr = (self.head_ptr[rows] - 1) % cap
+        self.head_ptr[rows] = ptr
+        self.body[rows, ptr] = cells
+        self.occupancy[rows, cells] += 1
+
+        growing = self.grow[rows]
+        trim = rows[~growing]
+        tail = self.body[trim, (self.head_ptr[trim] + self.length[trim]) % cap]
+        self.occupancy[trim, tail] -= 1
+        self.length[rows[growing]] += 1
+        self.grow[rows] = False
+
+        # Rocks appear at score milestones
+        need_rock = np.flatnonzero(moving & (self.score >= self.rock_milestone))
+        if need_rock.size:
+            self._spawn_rock(need_rock, self.blocked(need_rock))
+            self.rock_milestone[need_rock] += engine.SCORE_FOR_ROCK
+
+        # Interactions
+        head = new_head
+        ate = moving & (head == self.apple)
+        eaters = np.flatnonzero(ate)
+        if eaters.size:
+            self.grow[eaters] = True
+            self.score[eaters] += 10
+            self.move_delay[eaters] = np.maximum(
+                engine.MIN_MOVE_DELAY, self.move_delay[eaters] - engine.DELAY_DECREMENT
+            )
+            self.apples_eaten_count[eaters] += 1
+            blocked = self.blocked(eaters)
+
+            milestone = self.apples_eaten_count[eaters] % engine.APPLES_FOR_EVENT == 0
+            if milestone.any():
+                rows_m = eaters[milestone]
+                sub = blocked[milestone]
+                self._spawn(self.cookie, rows_m, sub)
+                self._spawn(self.banana, rows_m, sub)
+                for _ in range(engine.BOMBS_PER_EVENT):
+                    self._spawn_bomb(rows_m, sub)
+                blocked[milestone] = sub
+
+            star_roll = (
+                (self.star[eaters] == NO_CELL)
+                & (self.now[eaters] > self.star_end_time[eaters])
+                & (self.rng.random(eaters.size) < engine.STAR_CHANCE)
+            )
+            if star_roll.any():
+                sub = blocked[star_roll]
+                self._spawn(self.star, eaters[star_roll], sub)
+                blocked[star_roll] = sub
+            self._spawn(self.apple, eaters, blocked)
+
+        got_cookie = moving & (head == self.cookie)
+        self.score[got_cookie] += 50
+        self.cookie[got_cookie] = NO_CELL
+
+        got_banana = moving & (head == self.banana)
+        self.score[got_banana] += 20
+        self.banana[got_banana] = NO_CELL
+
+        got_star = moving & (head == self.star)
+        self.star_end_time[got_star] = self.now[got_star] + engine.STAR_DURATION
+        self.star[got_star] = NO_CELL
+
+        hit_bomb = moving & self.bombs[self._rows, head]
+        self.bombs[hit_bomb, head[hit_bomb]] = False
+        too_short = hit_bomb & (self.length <= engine.BOMB_SHRINK)
+        crashed |= too_short
+        shrink = np.flatnonzero(hit_bomb & ~too_short)
+        if shrink.size:
+            end = self.head_ptr[shrink] + self.length[shrink] - 1
+            for k in range(engine.BOMB_SHRINK):
+                tail = self.body[shrink, (end - k) % cap]
+                self.occupancy[shrink, tail] -= 1
+            self.length[shrink] -= engine.BOMB_SHRINK
+
+        crashed |= moving & self.rocks[self._rows, head]
+
+        self.alive &= ~crashed
+        return self.score - score_before, crashed
+
+
+# --- Benchmark ---
+def _random_actions(rng, n):
+    # Mostly go straight, turn now and then, like a restless player
+    actions = rng.integers(0, 4, n, dtype=np.int8)
+    actions[rng.random(n) < 0.7] = NO_TURN
+    return actions
+
+
+def benchmark_batch(n, ticks, seed=0):
+    game = BatchGame(n, seed=seed)
+    rng = np.random.default_rng(seed)
+    actions = [_random_actions(rng, n) for _ in range(64)]
+    start = time.perf_counter()
+    for t in range(ticks):
+        _, done = game.step(actions[t % 64])
+        if done.any():
+            game.reset(done)
+    return n * ticks / (time.perf_counter() - start)
+
+
+def benchmark_scalar(ticks, seed=0):
+    game = engine.GameState(seed=seed)
+    rng = np.random.default_rng(seed)
+    codes = _random_actions(rng, ticks).tolist()
+    start = time.perf_counter()
+    for code in codes:
+        game.step(None if code == NO_TURN else engine.DIRECTIONS[code])
+        if not game.snake.alive:
+            game.reset()
+    return ticks / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    # Usage: python batch_engine.py [boards] [ticks]
+    boards = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    scalar = benchmark_scalar(boards * ticks // 16)
+    batch = benchmark_batch(boards, ticks)
+    print(f"scalar engine.GameState: {scalar:,.0f} board-steps/sec")
+    print(f"BatchGame x{boards}: {batch:,.0f} board-steps/sec ({batch / scalar:.1f}x)")
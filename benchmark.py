@@ -0,0 +1,293 @@
+"""
+Benchmarks for the hot paths: snake movement, item and rock spawning,
+snake drawing, full frames at several window sizes and sound playback.
+
+Runs headless (the SDL dummy video and audio drivers are used unless
+set otherwise) and reports the median time per call.
+
+Usage:
+    python benchmark.py                          print the results
+    python benchmark.py --json out.json          also save them as JSON
+    python benchmark.py --compare base.json      flag regressions against
+                                                 a saved run (exit code 1)
+    python benchmark.py --filter draw            only groups whose name
+                                                 contains "draw"
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import engine  # noqa: E402
+
+# A repeat is sized to take about this long; the median of REPEATS is kept
+TARGET_SECONDS = 0.05
+REPEATS = 7
+# Slower than baseline by more than this fraction counts as a regression
+DEFAULT_TOLERANCE = 0.15
+
+WINDOW_SIZES = [(810, 600), (1280, 720), (1920, 1080), (3840, 2160)]
+FILL_LEVELS = [0.0, 0.5, 0.9, 0.99]
+
+
+# --- Timing ---
+def measure(func, repeats=REPEATS):
+    """
+    Calls func() in batches sized to TARGET_SECONDS and returns timing
+    stats per call, in microseconds.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= TARGET_SECONDS / 10 or number >= 1 << 20:
+            break
+        number *= 10
+    number = max(1, int(number * TARGET_SECONDS / max(elapsed, 1e-9)))
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "max_us": max(samples),
+        "calls": number * repeats,
+    }
+
+
+# --- Fixtures ---
+def board_cycle(width, height):
+    """
+    A Hamiltonian cycle over the board (height must be even): along the
+    top row, back and forth over the rest, then up the first column. The
+    default snake start lies on it, heading the same way. Returns the
+    direction to take from each packed cell, as the snake's body holds.
+    """
+    path = [(x, 0) for x in range(width)]
+    for y in range(1, height):
+        xs = range(width - 1, 0, -1) if y % 2 else range(1, width)
+        path.extend((x, y) for x in xs)
+    path.extend((0, y) for y in range(height - 1, 0, -1))
+    next_dir = {}
+    for i, (x, y) in enumerate(path):
+        nx, ny = path[(i + 1) % len(path)]
+        next_dir[y * width + x] = (nx - x, ny - y)
+    return next_dir
+
+
+def snake_on_cycle(
+    snake_cls, length, width=engine.GRID_WIDTH, height=engine.GRID_HEIGHT
+):
+    """A snake of the given length that can follow the cycle forever."""
+    board = engine.Board(width, height)
+    snake = snake_cls(board)
+    next_dir = board_cycle(width, height)
+    while len(snake.body) < length:
+        snake.grow = True
+        snake.turn(next_dir[snake.body[0]])
+        snake.update_logic()
+    return snake, next_dir
+
+
+def filled_board(fill, seed=0):
+    board = engine.Board()
+    cells = [(x, y) for y in range(board.height) for x in range(board.width)]
+    for x, y in random.Random(seed).sample(cells, int(len(cells) * fill)):
+        board.occupy(x, y)
+    return board
+
+
+# --- Benchmarks ---
+def bench_update_logic(results):
+    full = engine.GRID_WIDTH * engine.GRID_HEIGHT - 1
+    for length in (4, 64, 256, full):
+        snake, next_dir = snake_on_cycle(engine.Snake, length)
+
+        def move():
+            snake.turn(next_dir[snake.body[0]])
+            snake.update_logic()
+
+        results[f"update_logic/len={length}"] = measure(move)
+        assert snake.alive and len(snake.body) == length
+
+
+def bench_spawn(results):
+    rng = random.Random(1)
+    for fill in FILL_LEVELS:
+        board = filled_board(fill)
+        item = engine.Item("apple", board)
+        results[f"item_spawn/fill={fill:.0%}"] = measure(lambda: item.spawn_random(rng))
+        item.despawn()
+        rock = engine.BigRock(board)
+        results[f"rock_spawn/fill={fill:.0%}"] = measure(lambda: rock.spawn_random(rng))
+
+
+def bench_draw(results, front_end):
+    surface = front_end.game_surface
+    sprites = front_end.sprites_loaded
+    try:
+        for use_sprites in (True, False):
+            if use_sprites and not sprites:
+                continue
+            front_end.sprites_loaded = use_sprites
+            label = "sprites" if use_sprites else "shapes"
+            for length in (4, 64, 256):
+                snake, _ = snake_on_cycle(front_end.Snake, length)
+                results[f"snake_draw/{label}/len={length}"] = measure(
+                    lambda: snake.draw(surface, 0.5)
+                )
+    finally:
+        front_end.sprites_loaded = sprites
+
+
+def bench_frame(results, front_end):
+    """Full software frame as main() draws it in play, then scaled and flipped."""
+    presenter = front_end.presenter
+    surface = front_end.game_surface
+    game = front_end.Game(seed=3)
+    snake, _ = snake_on_cycle(front_end.Snake, 64)
+    background = front_end.build_background(False)
+    font = front_end.fonts.get("comicsansms", 30, bold=True)
+
+    def frame():
+        surface.blit(background, (0, 0))
+        for item in (game.apple, game.cookie, game.banana, game.star):
+            item.draw(surface)
+        snake.draw(surface, 0.5)
+        front_end.text_cache.blit_number(
+            surface, font, "Score: ", game.score, front_end.COLOR_TEXT, (20, 20)
+        )
+        presenter.present()
+
+    if not isinstance(presenter, front_end.render.SoftwarePresenter):
+        # SDL scales to whatever the window is; it can't be resized here
+        results["frame/sdl-scaled"] = measure(frame)
+        return
+    try:
+        for size in WINDOW_SIZES:
+            presenter.screen = pygame.display.set_mode(size, pygame.RESIZABLE)
+            results[f"frame/{size[0]}x{size[1]}"] = measure(frame)
+    finally:
+        presenter.screen = pygame.display.set_mode(
+            (front_end.VIRTUAL_WIDTH, front_end.VIRTUAL_HEIGHT), pygame.RESIZABLE
+        )
+
+
+def bench_sound(results, front_end):
+    manager = front_end.sound_manager
+    if not manager.sounds_enabled:
+        print("Skipping sound: mixer unavailable")
+        return
+    for file_name in ("eat.wav", "crash.wav"):
+        results[f"play_sound/{file_name}"] = measure(
+            lambda: manager.play_sound(file_name)
+        )
+    pygame.mixer.stop()
+
+
+# --- Reporting ---
+def run(pattern=None):
+    import main as front_end
+
+    front_end.init()  # Opens the (dummy) window and mixer
+
+    benches = [
+        ("update_logic", bench_update_logic),
+        ("spawn", bench_spawn),
+        ("snake_draw", lambda r: bench_draw(r, front_end)),
+        ("frame", lambda r: bench_frame(r, front_end)),
+        ("play_sound", lambda r: bench_sound(r, front_end)),
+    ]
+    results = {}
+    for name, bench in benches:
+        if pattern is not None and pattern not in name:
+            continue
+        batch = {}
+        bench(batch)
+        for key, stats in batch.items():
+            results[key] = stats
+            print(f"{key:34} {stats['median_us']:12.2f} us")
+    return results
+
+
+def metadata():
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "sdl": ".".join(map(str, pygame.get_sdl_version())),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Prints each benchmark against the baseline; returns the regressions."""
+    regressions = []
+    print(f"\n{'benchmark':34} {'baseline':>12} {'now':>12} {'change':>8}")
+    for key, stats in results.items():
+        old = baseline.get(key)
+        if old is None:
+            print(f"{key:34} {'-':>12} {stats['median_us']:12.2f}      new")
+            continue
+        ratio = stats["median_us"] / old["median_us"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(
+            f"{key:34} {old['median_us']:12.2f} {stats['median_us']:12.2f} "
+            f"{ratio - 1:+8.1%}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snake hot-path benchmarks")
+    parser.add_argument("--json", metavar="PATH", help="save results as JSON")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="baseline JSON to compare with"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="allowed slowdown before flagging (default %(default)s)",
+    )
+    parser.add_argument("--filter", metavar="TEXT", help="only groups containing TEXT")
+    args = parser.parse_args()
+
+    results = run(args.filter)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": metadata(), "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
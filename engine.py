@@ -0,0 +1,599 @@
+import random
+from array import array
+from collections import deque
+
+# --- Rule Constants ---
+# The board is measured in cells. The renderer in main.py maps each cell
+# to a GRID_SIZE pixel square on the 810x600 virtual surface.
+GRID_WIDTH = 27
+GRID_HEIGHT = 20
+# The smallest board side the snake's four-cell start fits on
+MIN_BOARD_SIDE = 6
+
+# Game Speed Settings
+START_MOVE_DELAY = 160.0
+DELAY_DECREMENT = 1.75
+MIN_MOVE_DELAY = 10.0
+# Turns pressed faster than the snake moves wait their turn, one per tick
+TURN_QUEUE_SIZE = 3
+
+# Event Settings
+APPLES_FOR_EVENT = 10
+SCORE_FOR_ROCK = 200
+STAR_DURATION = 10000
+STAR_CHANCE = 0.15
+BOMBS_PER_EVENT = 4
+BOMB_SHRINK = 4
+
+# Directions
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+# Action codes, shared by replays, the network protocol and the batch
+# engine and training env: code i is a turn toward DIRECTIONS[i]
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+DIRECTION_CODES = {d: code for code, d in enumerate(DIRECTIONS)}
+
+# Events returned by GameState.step so the caller can play sounds
+EVENT_EAT = "eat"
+EVENT_BONUS = "bonus"
+EVENT_POWERUP = "powerup"
+EVENT_POWERUP_END = "powerup_end"
+EVENT_EXPLODE = "explode"
+EVENT_CRASH = "crash"
+
+
+# --- Free Cell Index ---
+def cell_typecode(cells):
+    """Array typecode for cell numbers and -1 on a board of this many cells."""
+    return "h" if cells <= 0x7FFF else "i"
+
+
+class Board:
+    """
+    Tracks which cells are free so items can spawn in O(1).
+
+    Every occupant (snake segment, item, bomb, rock cell) calls occupy()
+    and vacate(); a cell is free while its count is zero. Free cells live
+    in a swap-remove list with a cell -> index map, so adding, removing
+    and picking a random free cell are all constant time. The same is
+    kept for 2x2 corners (top-left cells whose whole 2x2 block is free)
+    so rocks spawn the same way.
+
+    Items, bombs and rocks also register themselves per cell through
+    place() and clear(), so whatever the head lands on is one lookup.
+
+    Cells are packed as y * width + x, and the integer grids are arrays
+    rather than lists of int objects, which keeps big boards compact.
+    """
+
+    __slots__ = (
+        "width",
+        "height",
+        "counts",
+        "free",
+        "free_index",
+        "corners",
+        "corner_index",
+        "entities",
+    )
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.reset()
+
+    def reset(self):
+        """
+        Empties the board. The free lists go back to their initial order,
+        so the same seed picks the same cells however the board was used.
+        """
+        width, height = self.width, self.height
+        cells = width * height
+        # Cell numbers (and -1) fit in 16 bits on all but huge boards, and
+        # at most two things ever share a cell
+        cell_type = cell_typecode(cells)
+        self.counts = array("B", [0]) * cells
+        self.free = array(cell_type, range(cells))
+        self.free_index = array(cell_type, range(cells))
+        self.corners = array(cell_type)
+        self.corner_index = array(cell_type, [-1]) * cells
+        self.entities = [None] * cells
+        # Filled a row at a time: big boards have a lot of cells
+        corners = self.corners
+        corner_index = self.corner_index
+        for y in range(height - 1):
+            row = y * width
+            corner_index[row : row + width - 1] = array(
+                cell_type, range(len(corners), len(corners) + width - 1)
+            )
+            corners.extend(range(row, row + width - 1))
+
+    @staticmethod
+    def _remove(cells, index, cell):
+        i = index[cell]
+        last = cells.pop()
+        if last != cell:
+            cells[i] = last
+            index[last] = i
+        index[cell] = -1
+
+    def _corner_span(self, x, y):
+        """
+        The 2x2 blocks that contain (x, y), as the range of their rows'
+        first cells and the columns [left, right) of their top-left cells.
+        Worked out each time rather than kept per cell, which would cost
+        more than the board itself on big boards.
+        """
+        w = self.width
+        top = y - 1 if y else 0
+        bottom = y + 1 if y < self.height - 1 else y
+        left = x - 1 if x else 0
+        right = x + 1 if x < w - 1 else x
+        return range(top * w, bottom * w, w), left, right
+
+    def occupy(self, x, y):
+        cell = y * self.width + x
+        count = self.counts[cell]
+        self.counts[cell] = count + 1
+        if count == 0:
+            self._remove(self.free, self.free_index, cell)
+            corner_index = self.corner_index
+            rows, left, right = self._corner_span(x, y)
+            for row in rows:
+                for corner in range(row + left, row + right):
+                    if corner_index[corner] >= 0:
+                        self._remove(self.corners, corner_index, corner)
+
+    def vacate(self, x, y):
+        cell = y * self.width + x
+        counts = self.counts
+        count = counts[cell] - 1
+        counts[cell] = count
+        if count == 0:
+            self.free_index[cell] = len(self.free)
+            self.free.append(cell)
+            w = self.width
+            corners = self.corners
+            rows, left, right = self._corner_span(x, y)
+            for row in rows:
+                for corner in range(row + left, row + right):
+                    if not (
+                        counts[corner]
+                        or counts[corner + 1]
+                        or counts[corner + w]
+                        or counts[corner + w + 1]
+                    ):
+                        self.corner_index[corner] = len(corners)
+                        corners.append(corner)
+
+    def place(self, x, y, entity):
+        """Occupies the cell on behalf of an item or rock."""
+        self.occupy(x, y)
+        self.entities[y * self.width + x] = entity
+
+    def clear(self, x, y):
+        self.entities[y * self.width + x] = None
+        self.vacate(x, y)
+
+    def entity_at(self, x, y):
+        """The item or rock on (x, y), or None."""
+        return self.entities[y * self.width + x]
+
+    def xy(self, cell):
+        """The (x, y) of a packed cell."""
+        return cell % self.width, cell // self.width
+
+    def random_free(self, rng):
+        """A random free cell as (x, y), or None if the board is full."""
+        if not self.free:
+            return None
+        cell = self.free[rng.randrange(len(self.free))]
+        return cell % self.width, cell // self.width
+
+    def random_corner(self, rng):
+        """Top-left (x, y) of a random free 2x2 block, or None."""
+        if not self.corners:
+            return None
+        cell = self.corners[rng.randrange(len(self.corners))]
+        return cell % self.width, cell // self.width
+
+
+# --- Game Classes (logic only, no pygame) ---
+class Snake:
+    """
+    The body is a deque of packed cells (y * width + x, head first) plus a
+    per-cell count grid, so moving, growing, shrinking and self-collision
+    checks are all constant time. board.xy() turns a cell back into (x, y).
+
+    Interpolation does not need a copy of last tick's body: after a move,
+    segment i used to be where segment i + 1 is now, and the last segment
+    used to be on cell prev_tail.
+
+    Each cell also records the move number on which the head entered it,
+    so segment_at() finds which segment is on a cell without walking the
+    body (the renderer uses it to draw only what the camera sees).
+
+    new_direction is the heading for the next tick; turns made before that
+    tick has run queue up behind it (up to TURN_QUEUE_SIZE in all) and are
+    applied one per tick, so two quick presses both land.
+    """
+
+    __slots__ = (
+        "board",
+        "width",
+        "height",
+        "cell_counts",
+        "cell_stamps",
+        "body",
+        "head_stamp",
+        "prev_tail",
+        "moved",
+        "direction",
+        "new_direction",
+        "queued_turns",
+        "grow",
+        "alive",
+        "wrap_mode",
+    )
+
+    def __init__(self, board):
+        self.board = board
+        self.width = board.width
+        self.height = board.height
+        self.cell_counts = array("i", [0]) * (self.width * self.height)
+        self.cell_stamps = array("q", [0]) * (self.width * self.height)
+        self.body = deque()
+        self.queued_turns = deque()
+        self.reset()
+
+    def reset(self):
+        w, h = self.width, self.height
+        # Four cells in the middle row, heading right
+        head = (h // 2) * w + w // 2
+        start = [head, head - 1, head - 2, head - 3]
+        counts = self.cell_counts
+        board = self.board
+        for cell in self.body:
+            counts[cell] -= 1
+            board.vacate(cell % w, cell // w)
+        self.head_stamp = len(start) - 1
+        for i, cell in enumerate(start):
+            counts[cell] += 1
+            self.cell_stamps[cell] = self.head_stamp - i
+            board.occupy(cell % w, cell // w)
+        self.body = deque(start)
+        self.prev_tail = start[-1]
+        self.moved = False
+        self.direction = RIGHT
+        self.new_direction = RIGHT
+        self.queued_turns.clear()
+        self.grow = False
+        self.alive = True
+        self.wrap_mode = False
+
+    def segment_at(self, x, y):
+        """Index of the segment on cell (x, y), 0 for the head, or -1."""
+        cell = y * self.width + x
+        if not self.cell_counts[cell]:
+            return -1
+        return self.head_stamp - self.cell_stamps[cell]
+
+    def turn(self, direction):
+        """Queues a turn and returns whether it was taken."""
+        # Checked against the heading it will follow: reversing straight
+        # into the neck and repeating that heading are both ignored
+        queued = self.queued_turns
+        dx, dy = direction
+        if not queued and self.new_direction == self.direction:
+            if self.direction == (-dx, -dy) or direction == self.direction:
+                return False
+            self.new_direction = direction
+            return True
+        last = queued[-1] if queued else self.new_direction
+        if last in (direction, (-dx, -dy)) or len(queued) + 1 >= TURN_QUEUE_SIZE:
+            return False
+        queued.append(direction)
+        return True
+
+    def shrink(self, amount):
+        current_len = len(self.body)
+        new_len = max(1, current_len - amount)
+        body = self.body
+        counts = self.cell_counts
+        w = self.width
+        for _ in range(current_len - new_len):
+            tail = body.pop()
+            counts[tail] -= 1
+            self.board.vacate(tail % w, tail // w)
+            self.prev_tail = tail
+
+    def update_logic(self):
+        if not self.alive:
+            return
+
+        # A crash freezes the snake in place, so it stops interpolating
+        self.moved = False
+        self.direction = self.new_direction
+        if self.queued_turns:
+            self.new_direction = self.queued_turns.popleft()
+
+        w, h = self.width, self.height
+        head = self.body[0]
+        dx, dy = self.direction
+        new_x = head % w + dx
+        new_y = head // w + dy
+
+        if self.wrap_mode:
+            new_x %= w
+            new_y %= h
+        else:
+            if new_x < 0 or new_x >= w or new_y < 0 or new_y >= h:
+                self.alive = False
+                return
+
+        counts = self.cell_counts
+        cell = new_y * w + new_x
+        if counts[cell]:
+            self.alive = False
+            return
+
+        body = self.body
+        body.appendleft(cell)
+        counts[cell] += 1
+        self.head_stamp += 1
+        self.cell_stamps[cell] = self.head_stamp
+        board = self.board
+        board.occupy(new_x, new_y)
+        self.moved = True
+
+        if not self.grow:
+            tail = body.pop()
+            counts[tail] -= 1
+            board.vacate(tail % w, tail // w)
+            self.prev_tail = tail
+        else:
+            self.grow = False
+            self.prev_tail = body[-1]
+
+
+class Item:
+    __slots__ = ("kind", "board", "position", "active")
+
+    def __init__(self, kind, board):
+        self.kind = kind
+        self.board = board
+        self.position = (-1, -1)
+        self.active = False
+
+    def spawn_random(self, rng=random):
+        # Take the new cell before letting go of the old one so an active
+        # item never respawns where it already is
+        cell = self.board.random_free(rng)
+        if cell is None:
+            return
+        self.board.place(*cell, self)
+        if self.active:
+            self.board.clear(*self.position)
+        self.position = cell
+        self.active = True
+
+    def despawn(self):
+        if self.active:
+            self.board.clear(*self.position)
+            self.active = False
+
+
+class BigRock:
+    __slots__ = ("board", "position", "active", "footprint")
+    kind = "rock"
+
+    def __init__(self, board):
+        self.board = board
+        self.position = (-1, -1)
+        self.active = False
+        self.footprint = []
+
+    def spawn_random(self, rng=random):
+        corner = self.board.random_corner(rng)
+        if corner is None:
+            return
+        self.despawn()
+        x, y = corner
+        self.position = corner
+        self.footprint = [(x, y), (x + 1, y), (x, y + 1), (x + 1, y + 1)]
+        for spot in self.footprint:
+            self.board.place(*spot, self)
+        self.active = True
+
+    def despawn(self):
+        if self.active:
+            for spot in self.footprint:
+                self.board.clear(*spot)
+            self.active = False
+
+
+# --- Game State ---
+class GameState:
+    """
+    All the rules of one run, with no window, mixer or font.
+
+    The clock is logical: `now` is in milliseconds and only moves when the
+    caller says so. step() without a timestamp advances it by exactly
+    move_delay, so a headless run plays out as if every frame landed
+    on time. Randomness comes from `rng`, and reset() lays the board out
+    from scratch, so a seed reproduces a run (see replay.py).
+    """
+
+    # Subclasses (the pygame front end) swap these for drawable versions
+    snake_cls = Snake
+    item_cls = Item
+    rock_cls = BigRock
+
+    def __init__(self, seed=None, rng=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.board = Board(width, height)
+        self.snake = self.snake_cls(self.board)
+        self.apple = self.item_cls("apple", self.board)
+        self.banana = self.item_cls("banana", self.board)
+        self.cookie = self.item_cls("cookie", self.board)
+        self.star = self.item_cls("star", self.board)
+        # Bombs are keyed by cell so one can be dropped in O(1). Exploded
+        # bombs wait in the pool to be respawned instead of reallocated.
+        self.bombs = {}
+        self.bomb_pool = []
+        self.rocks = []
+        # Bumped whenever a bomb or rock appears or disappears, so renderers
+        # know when their cached picture of the static scenery is stale
+        self.static_version = 0
+        self.now = 0
+        self.reset()
+
+    def reset(self, now=None, seed=None):
+        """Starts a new run, reseeding the rng first if a seed is given."""
+        if now is not None:
+            self.now = now
+        if seed is not None:
+            self.rng.seed(seed)
+        for b in self.bombs.values():
+            b.despawn()
+            self.bomb_pool.append(b)
+        self.bombs.clear()
+        for r in self.rocks:
+            r.despawn()
+        self.rocks = []
+        self.apple.despawn()
+        self.cookie.despawn()
+        self.banana.despawn()
+        self.star.despawn()
+        self.snake.reset()
+        # Only the snake is left; lay it onto a fresh board so the run
+        # doesn't depend on what happened in earlier ones
+        board = self.board
+        board.reset()
+        for cell in self.snake.body:
+            board.occupy(*board.xy(cell))
+
+        self.score = 0
+        self.move_delay = START_MOVE_DELAY
+        self.last_move_time = self.now
+        self.apples_eaten_count = 0
+        self.static_version += 1
+        self.rock_milestone = SCORE_FOR_ROCK
+        self.star_end_time = 0
+        self.apple.spawn_random(self.rng)
+
+    def update_timers(self, now):
+        """Per-frame bookkeeping: star expiry toggles wrap mode off."""
+        events = []
+        self.now = now
+        if now < self.star_end_time:
+            self.snake.wrap_mode = True
+        else:
+            if self.snake.wrap_mode:
+                events.append(EVENT_POWERUP_END)
+            self.snake.wrap_mode = False
+        return events
+
+    def is_move_due(self, now):
+        return now - self.last_move_time >= self.move_delay
+
+    def step(self, action=None, now=None):
+        """
+        Runs one logic tick and returns the list of events it produced.
+
+        `action` is a direction tuple (or None to keep going straight).
+        `now` defaults to the previous move time plus move_delay.
+        """
+        if now is None:
+            now = self.last_move_time + self.move_delay
+        events = self.update_timers(now)
+        snake = self.snake
+        if not snake.alive:
+            return events
+
+        if action is not None:
+            snake.turn(action)
+        snake.update_logic()
+        if not snake.alive:
+            events.append(EVENT_CRASH)
+        self.last_move_time = now
+        rng = self.rng
+
+        if self.score >= self.rock_milestone:
+            r = self.rock_cls(self.board)
+            r.spawn_random(rng)
+            self.rocks.append(r)
+            self.static_version += 1
+            self.rock_milestone += SCORE_FOR_ROCK
+
+        # Interactions. Spawns only use free cells, so at most one thing
+        # sits under the head
+        hit = self.board.entities[snake.body[0]]
+        if hit is None:
+            return events
+        kind = hit.kind
+
+        if kind == "apple":
+            snake.grow = True
+            self.score += 10
+            events.append(EVENT_EAT)
+            self.move_delay = max(MIN_MOVE_DELAY, self.move_delay - DELAY_DECREMENT)
+            self.apples_eaten_count += 1
+
+            if self.apples_eaten_count % APPLES_FOR_EVENT == 0:
+                self.cookie.spawn_random(rng)
+                self.banana.spawn_random(rng)
+                pool = self.bomb_pool
+                for _ in range(BOMBS_PER_EVENT):
+                    b = pool.pop() if pool else self.item_cls("bomb", self.board)
+                    b.spawn_random(rng)
+                    if b.active:
+                        self.bombs[b.position] = b
+                    else:
+                        pool.append(b)
+                self.static_version += 1
+
+            if not self.star.active and now > self.star_end_time:
+                if rng.random() < STAR_CHANCE:
+                    self.star.spawn_random(rng)
+            hit.spawn_random(rng)
+
+        elif kind == "cookie":
+            self.score += 50
+            events.append(EVENT_BONUS)
+            hit.despawn()
+
+        elif kind == "banana":
+            self.score += 20
+            events.append(EVENT_BONUS)
+            hit.despawn()
+
+        elif kind == "star":
+            events.append(EVENT_POWERUP)
+            self.star_end_time = now + STAR_DURATION
+            hit.despawn()
+
+        elif kind == "bomb":
+            events.append(EVENT_EXPLODE)
+            if len(snake.body) <= BOMB_SHRINK:
+                snake.alive = False
+            else:
+                snake.shrink(BOMB_SHRINK)
+            del self.bombs[hit.position]
+            hit.despawn()
+            self.bomb_pool.append(hit)
+            self.static_version += 1
+
+        elif kind == "rock":
+            events.append(EVENT_CRASH)
+            snake.alive = False
+
+        return events
+
+    def interpolation_alpha(self, now):
+        alpha = (now - self.last_move_time) / self.move_delay
+        if alpha > 1.0:
+            alpha = 1.0
+        return alpha
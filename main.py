@@ -1,17 +1,28 @@
+import atexit
 import math
+import os
 import random
 import sys
+import time
 
 import pygame
 
+import assetpack
+import autopilot
+import engine
+import profiler
+import render
+import replay
+from engine import GRID_HEIGHT, GRID_WIDTH
+
 # --- Configuration & Constants ---
 # We use "Virtual" dimensions for the game logic.
 # The window can be any size, but the game thinks it's 810x600.
 VIRTUAL_WIDTH = 810
 VIRTUAL_HEIGHT = 600
 GRID_SIZE = 30
-GRID_WIDTH = VIRTUAL_WIDTH // GRID_SIZE
-GRID_HEIGHT = VIRTUAL_HEIGHT // GRID_SIZE
+# The board size (GRID_WIDTH x GRID_HEIGHT cells) lives with the rules in
+# engine.py and must match VIRTUAL_WIDTH // GRID_SIZE x VIRTUAL_HEIGHT // GRID_SIZE.
 
 # Colors
 COLOR_BG = (240, 248, 255)
@@ -21,59 +32,226 @@ COLOR_BUTTON_HOVER = (65, 105, 225)
 COLOR_TIMER = (255, 215, 0)
 COLOR_LETTERBOX = (50, 50, 50)
 
-# Game Speed Settings
-START_MOVE_DELAY = 160.0
-DELAY_DECREMENT = 1.75
-MIN_MOVE_DELAY = 10.0
+# Frames per second drawn. Logic runs independently, one tick per
+# move_delay ms, with at most MAX_CATCH_UP_TICKS ticks in a single frame.
+RENDER_FPS = 60
+MAX_CATCH_UP_TICKS = 10
+
+# Board size in cells, picked at startup. Anything other than the 27x20
+# that fits the screen scrolls with a camera, e.g. SNAKE_BOARD=500x500
+MIN_BOARD_SIDE = engine.MIN_BOARD_SIDE
+
+
+def parse_board_size(value):
+    """(width, height) from "WxH", or the default board if it isn't one."""
+    try:
+        width, height = (int(n) for n in value.lower().split("x"))
+    except ValueError:
+        width = height = 0
+    if width < MIN_BOARD_SIDE or height < MIN_BOARD_SIDE:
+        print(
+            f"Warning: SNAKE_BOARD={value!r} is not a board size like 500x500 "
+            f"(at least {MIN_BOARD_SIDE}x{MIN_BOARD_SIDE}), using "
+            f"{GRID_WIDTH}x{GRID_HEIGHT}"
+        )
+        return GRID_WIDTH, GRID_HEIGHT
+    return width, height
+
+
+BOARD_WIDTH, BOARD_HEIGHT = GRID_WIDTH, GRID_HEIGHT
+if os.environ.get("SNAKE_BOARD"):
+    BOARD_WIDTH, BOARD_HEIGHT = parse_board_size(os.environ["SNAKE_BOARD"])
+
+# Redraw only changed regions during gameplay (toggle in game with F10)
+USE_DIRTY_RECTS = True
+
+# Menu, instructions, pause and game over only redraw on input, hover
+# changes or resizes, sleeping in event.wait (waking every IDLE_WAIT_MS)
+IDLE_REDRAW = True
+IDLE_WAIT_MS = 500
+
+# How the 810x600 surface reaches the window, picked at startup:
+# "software" scales it with pygame.transform, "scaled" lets SDL do it
+DEFAULT_PRESENT_BACKEND = "software"
+
+
+def parse_present_backend(value):
+    """The backend named by value, or the default if there is no such one."""
+    if value not in render.PRESENTERS:
+        print(
+            f"Warning: SNAKE_PRESENT={value!r} is not one of "
+            f"{', '.join(render.PRESENTERS)}, using {DEFAULT_PRESENT_BACKEND}"
+        )
+        return DEFAULT_PRESENT_BACKEND
+    return value
+
+
+PRESENT_BACKEND = DEFAULT_PRESENT_BACKEND
+if os.environ.get("SNAKE_PRESENT"):
+    PRESENT_BACKEND = parse_present_backend(os.environ["SNAKE_PRESENT"])
+
+# Every run is seeded and recorded; with SNAKE_REPLAY_DIR set, each one is
+# saved there as a .snkr file when it ends (see replay.py)
+REPLAY_DIR = os.environ.get("SNAKE_REPLAY_DIR")
+
+# F7 hands the snake to the autopilot; any arrow key takes it back. With
+# SNAKE_AUTOPILOT set the game starts in attract mode: straight into an
+# autopiloted run, and the next one starts AUTOPILOT_RESTART_MS after
+# each game over
+ATTRACT_MODE = bool(os.environ.get("SNAKE_AUTOPILOT"))
+AUTOPILOT_RESTART_MS = 3000
+
+# Images and sounds sit next to this file, wherever it is run from
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Event Settings
-APPLES_FOR_EVENT = 10
-SCORE_FOR_ROCK = 200
-STAR_DURATION = 10000
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+def asset_path(file_name):
+    return os.path.join(ASSET_DIR, file_name)
 
-# Create the actual window (Resizable)
-screen = pygame.display.set_mode((VIRTUAL_WIDTH, VIRTUAL_HEIGHT), pygame.RESIZABLE)
-pygame.display.set_caption("Snake 2.0 - Python Snake Game")
 
-# Create the "Virtual" Surface where we draw everything
-game_surface = pygame.Surface((VIRTUAL_WIDTH, VIRTUAL_HEIGHT))
+# Pre-scaled sprites in one file (build with `python assetpack.py`); used
+# when present and newer than the images, otherwise the PNGs are loaded
+ASSET_PACK = asset_path(assetpack.DEFAULT_PATH)
 
-clock = pygame.time.Clock()
+# Importing this module has no side effects: init() opens the window,
+# the mixer and the assets, and main() calls it if nobody did before.
+# The presenter decides how the 810x600 "virtual" surface everything is
+# drawn on gets scaled into the actual (resizable) window.
+presenter = None
+game_surface = None
+clock = None
+
+# Per-phase frame timing: F9 shows the overlay, F8 starts/stops a trace
+frame_profiler = profiler.FrameProfiler(RENDER_FPS)
+
+
+# --- Sprite Atlas ---
+class SpriteAtlas:
+    """
+    Every sprite the draw path needs, scaled and rotated once.
+
+    Entries are keyed by (name, angle) and built on first use, so
+    steady-state frames only do dictionary lookups. Sprites are drawn onto
+    the fixed-size virtual surface, so window scaling never touches them.
+    clear() drops them all when the window changes and the display pixel
+    format may have too.
+    """
+
+    def __init__(self):
+        self.sources = {}
+        self.cache = {}
+
+    def register(self, name, source, size):
+        # source is a Surface or an image file, loaded on first use; size
+        # is the sprite's (width, height) on the virtual surface
+        self.sources[name] = (source, size)
+
+    def get(self, name, angle=0):
+        key = (name, angle)
+        surf = self.cache.get(key)
+        if surf is None:
+            if name not in self.sources:
+                return None
+            raw, (w, h) = self.sources[name]
+            if isinstance(raw, str):
+                raw = pygame.image.load(raw).convert_alpha()
+                self.sources[name] = (raw, (w, h))
+            surf = raw
+            if raw.get_size() != (w, h):
+                surf = pygame.transform.scale(raw, (w, h))
+            if angle:
+                surf = pygame.transform.rotate(surf, angle)
+            self.cache[key] = surf
+        return surf
+
+    def clear(self):
+        self.cache.clear()
+
+    def warm(self):
+        for name in self.sources:
+            self.get(name)
+        for angle in HEAD_ANGLES.values():
+            self.get("head", angle)
+
+
+# Head sprite rotation for each direction (the image faces up)
+HEAD_ANGLES = {
+    engine.RIGHT: -90,
+    engine.LEFT: 90,
+    engine.DOWN: 180,
+    engine.UP: 0,
+}
 
 # --- Asset Loading ---
 sprites_loaded = False
-try:
+sprite_atlas = SpriteAtlas()
+ITEM_COLORS = {
+    "apple": (255, 50, 50),
+    "banana": (210, 180, 140),
+    "cookie": (210, 180, 140),
+    "star": (255, 255, 0),
+    "bomb": (0, 0, 0),
+}
+bg_image = None
+# Atlas name (Item kinds double as these) -> (image, size on the virtual surface)
+SPRITES = {
+    "head": ("head.png", (GRID_SIZE, GRID_SIZE)),
+    "body": ("body.png", (GRID_SIZE + 2, GRID_SIZE + 2)),
+    "apple": ("apple.png", (GRID_SIZE + 8, GRID_SIZE + 8)),
+    "cookie": ("cookie.png", (GRID_SIZE + 8, GRID_SIZE + 8)),
+    "bomb": ("bomb.png", (GRID_SIZE + 8, GRID_SIZE + 8)),
+    "rock": ("rock.png", (GRID_SIZE * 3, GRID_SIZE * 3)),
+    "star": ("star.png", (GRID_SIZE + 8, GRID_SIZE + 8)),
+    "banana": ("banana.png", (GRID_SIZE + 8, GRID_SIZE + 8)),
+}
+BACKGROUND_FILE = "background.png"
+# The background is drawn unscaled from the top-left corner, so only this
+# much of it is ever seen; the rest is not kept (or packed)
+BACKGROUND_AREA = (0, 0, VIRTUAL_WIDTH, VIRTUAL_HEIGHT)
+
+
+def asset_pack_entries():
+    """What goes into the asset pack: every sprite plus the background."""
+    entries = {
+        name: (asset_path(file_name), size)
+        for name, (file_name, size) in SPRITES.items()
+    }
+    entries["background"] = (asset_path(BACKGROUND_FILE), BACKGROUND_AREA)
+    return entries
+
+
+def load_assets():
+    """
+    Registers the sprites and loads the background, converted to the
+    display format. Sprite images are only decoded when first drawn,
+    unless an up-to-date asset pack already has them scaled.
+    """
+    global bg_image, sprites_loaded
+    files = [file_name for file_name, _ in asset_pack_entries().values()]
+    if assetpack.is_fresh(ASSET_PACK, files):
+        try:
+            pack = assetpack.load(ASSET_PACK)
+            for name, (_, size) in SPRITES.items():
+                sprite_atlas.register(name, pack[name].convert_alpha(), size)
+            bg_image = pack["background"].convert()
+            sprites_loaded = True
+            return
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: asset pack unusable, loading images instead ({e})")
+
     try:
-        bg_image = pygame.image.load("background.png")
+        image = pygame.image.load(asset_path(BACKGROUND_FILE))
+        area = pygame.Rect(BACKGROUND_AREA).clip(image.get_rect())
+        bg_image = image.subsurface(area).convert()
     except (pygame.error, FileNotFoundError):
         bg_image = None
 
-    raw_head = pygame.image.load("head.png").convert_alpha()
-    raw_body = pygame.image.load("body.png").convert_alpha()
-    raw_apple = pygame.image.load("apple.png").convert_alpha()
-    raw_cookie = pygame.image.load("cookie.png").convert_alpha()
-    raw_bomb = pygame.image.load("bomb.png").convert_alpha()
-    raw_rock = pygame.image.load("rock.png").convert_alpha()
-    raw_star = pygame.image.load("star.png").convert_alpha()
-    raw_banana = pygame.image.load("banana.png").convert_alpha()
-
-    # Scale Sprites
-    img_head = pygame.transform.scale(raw_head, (GRID_SIZE, GRID_SIZE))
-    img_body = pygame.transform.scale(raw_body, (GRID_SIZE + 2, GRID_SIZE + 2))
-    img_apple = pygame.transform.scale(raw_apple, (GRID_SIZE + 8, GRID_SIZE + 8))
-    img_cookie = pygame.transform.scale(raw_cookie, (GRID_SIZE + 8, GRID_SIZE + 8))
-    img_bomb = pygame.transform.scale(raw_bomb, (GRID_SIZE + 8, GRID_SIZE + 8))
-    img_rock = pygame.transform.scale(raw_rock, (GRID_SIZE * 3, GRID_SIZE * 3))
-    img_star = pygame.transform.scale(raw_star, (GRID_SIZE + 8, GRID_SIZE + 8))
-    img_banana = pygame.transform.scale(raw_banana, (GRID_SIZE + 8, GRID_SIZE + 8))
-
-    sprites_loaded = True
-except FileNotFoundError:
-    print("One or more images not found. Using fallback shapes.")
+    if all(os.path.exists(asset_path(file_name)) for file_name, _ in SPRITES.values()):
+        for name, (file_name, size) in SPRITES.items():
+            sprite_atlas.register(name, asset_path(file_name), size)
+        sprites_loaded = True
+    else:
+        print("One or more images not found. Using fallback shapes.")
 
 
 # --- Helper: Virtual Mouse Coordinates ---
@@ -82,28 +260,22 @@ def get_virtual_mouse_pos():
     Translates the real mouse position on the resizable window
     to the coordinates on the 810x600 game surface.
     """
-    real_w, real_h = screen.get_size()
-    real_mouse = pygame.mouse.get_pos()
-
-    # Calculate scale factor (Aspect Ratio Fit)
-    scale = min(real_w / VIRTUAL_WIDTH, real_h / VIRTUAL_HEIGHT)
-
-    # Calculate the size of the game on screen
-    new_w = VIRTUAL_WIDTH * scale
-    new_h = VIRTUAL_HEIGHT * scale
-
-    # Calculate offset (centering)
-    offset_x = (real_w - new_w) // 2
-    offset_y = (real_h - new_h) // 2
+    return presenter.to_virtual(pygame.mouse.get_pos())
 
-    # Translate coordinate
-    vx = (real_mouse[0] - offset_x) / scale
-    vy = (real_mouse[1] - offset_y) / scale
 
-    return int(vx), int(vy)
+# --- Sound Manager ---
+# One-shot effects and how much they matter when every channel is busy.
+# A new sound may cut off one of equal or lower priority, never a higher one.
+SOUND_PRIORITIES = {
+    "eat.wav": 0,
+    "bonus.wav": 1,
+    "powerup.wav": 2,
+    "explode.wav": 2,
+    "crash.wav": 3,
+}
+EFFECT_CHANNELS = 6
 
 
-# --- Sound Manager ---
 class SoundManager:
     def __init__(self):
         self.sounds_enabled = True
@@ -120,29 +292,87 @@ class SoundManager:
             print(f"Warning: error checking mixer initialization: {e}")
             self.sounds_enabled = False
 
-        # We must hold the sound object in a variable to stop it later
+        # Every effect is decoded once here; playing never touches the disk
+        self.bank = {}
         self.powerup_loop_snd = None
+        self.loop_channel = None
+        self.effect_channels = []
+        # Per effect channel: (priority, start order) of what it is playing
+        self.channel_voices = []
+        self.voice_counter = 0
 
         if self.sounds_enabled:
+            for file_name in SOUND_PRIORITIES:
+                try:
+                    self.bank[file_name] = pygame.mixer.Sound(asset_path(file_name))
+                except (pygame.error, FileNotFoundError) as e:
+                    print(f"Warning: {file_name} not found or failed to load ({e})")
             try:
-                # Pre-load the loop sound specifically
-                self.powerup_loop_snd = pygame.mixer.Sound("powerup_loop.wav")
+                # We must hold the loop sound in a variable to stop it later
+                self.powerup_loop_snd = pygame.mixer.Sound(
+                    asset_path("powerup_loop.wav")
+                )
             except (pygame.error, FileNotFoundError) as e:
                 print(f"Warning: powerup_loop.wav not found or failed to load ({e})")
 
+            # Channel 0 is kept for the powerup loop, the rest for effects.
+            # Reserved channels are never handed out by Sound.play().
+            reserved = 1 + EFFECT_CHANNELS
+            if pygame.mixer.get_num_channels() < reserved:
+                pygame.mixer.set_num_channels(reserved)
+            pygame.mixer.set_reserved(reserved)
+            self.loop_channel = pygame.mixer.Channel(0)
+            self.effect_channels = [pygame.mixer.Channel(i) for i in range(1, reserved)]
+            self.channel_voices = [(-1, 0)] * EFFECT_CHANNELS
+
+    def _pick_channel(self, priority):
+        # A free channel if there is one, otherwise steal the oldest voice
+        # of the lowest priority, as long as it isn't more important
+        victim = None
+        for i, channel in enumerate(self.effect_channels):
+            if not channel.get_busy():
+                return i
+            if victim is None or self.channel_voices[i] < self.channel_voices[victim]:
+                victim = i
+        if victim is not None and self.channel_voices[victim][0] <= priority:
+            return victim
+        return None
+
     # This generic function is fine for one-off sounds (eat, crash)
     def play_sound(self, file_name):
         if not self.sounds_enabled:
             return
+        snd = self.bank.get(file_name)
+        if snd is None:
+            return
+        priority = SOUND_PRIORITIES[file_name]
+        i = self._pick_channel(priority)
+        if i is None:
+            return
         try:
-            snd = pygame.mixer.Sound(file_name)
-            snd.play()
-        except (pygame.error, FileNotFoundError) as e:
-            # Known pygame/file errors: warn but continue running
+            self.effect_channels[i].play(snd)
+        except pygame.error as e:
+            # Known pygame errors: warn but continue running
             print(f"Warning: failed to play sound '{file_name}': {e}")
-        except Exception as e:
-            # Catch other unexpected errors without using a bare except
-            print(f"Warning: unexpected error playing sound '{file_name}': {e}")
+            return
+        self.voice_counter += 1
+        self.channel_voices[i] = (priority, self.voice_counter)
+
+    def play_event(self, event):
+        # Maps the events returned by engine.GameState.step to sounds
+        if event == engine.EVENT_EAT:
+            self.play_eat()
+        elif event == engine.EVENT_BONUS:
+            self.play_bonus()
+        elif event == engine.EVENT_EXPLODE:
+            self.play_explode()
+        elif event == engine.EVENT_CRASH:
+            self.play_crash()
+        elif event == engine.EVENT_POWERUP:
+            self.play_powerup()
+            self.start_powerup_loop()
+        elif event == engine.EVENT_POWERUP_END:
+            self.stop_powerup_loop()
 
     # One-shot sounds
     def play_eat(self):
@@ -164,133 +394,176 @@ class SoundManager:
     def start_powerup_loop(self):
         # We check if the variable exists, not the function
         if self.powerup_loop_snd:
-            self.powerup_loop_snd.stop()  # Stop just in case it's running
-            self.powerup_loop_snd.play(loops=-1)  # -1 means loop forever
+            # Channel.play replaces whatever was running on the loop channel
+            self.loop_channel.play(self.powerup_loop_snd, loops=-1)  # -1 = forever
 
     def stop_powerup_loop(self):
         if self.powerup_loop_snd:
-            self.powerup_loop_snd.stop()
+            self.loop_channel.stop()
 
 
-sound_manager = SoundManager()
+sound_manager = None
+
+
+# --- Replay Log ---
+class ReplayLog:
+    """Starts seeded runs and saves a replay of each one when it ends."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.game = None
+        self.seed = None
+        self.recorder = None
+
+    def new_run(self, game, now):
+        self.finish()
+        self.seed = random.getrandbits(32)
+        game.reset(now, seed=self.seed)
+        self.game = game
+        self.recorder = replay.Recorder(game, self.seed)
+
+    def before_step(self):
+        if self.recorder:
+            self.recorder.before_step(self.game)
+
+    def finish(self):
+        if self.recorder is None:
+            return
+        data = self.recorder.finish(self.game)
+        self.recorder = None
+        if not self.directory:
+            return
+        path = os.path.join(
+            self.directory, f"run-{time.strftime('%Y%m%d-%H%M%S')}-{self.seed:08x}.snkr"
+        )
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            print(f"Warning: could not save replay {path} ({e})")
+
+
+replay_log = ReplayLog(REPLAY_DIR)
+
+
+# --- Fonts and Text ---
+# Shared by the buttons and main(); text is rasterized once and reused
+fonts = render.FontRegistry()
+text_cache = render.TextCache()
 
 
 # --- UI Classes ---
 class Button:
+    __slots__ = ("text", "rect", "action_code", "color", "hover_color", "font")
+
     def __init__(self, text, x, y, width, height, action_code):
         self.text = text
         self.rect = pygame.Rect(x, y, width, height)
         self.action_code = action_code
         self.color = COLOR_BUTTON
         self.hover_color = COLOR_BUTTON_HOVER
-        self.font = pygame.font.SysFont("comicsansms", 24, bold=True)
+        self.font = fonts.get("comicsansms", 24, bold=True)
 
     def draw(self, surface):
-        # We pass the virtual mouse pos to check hover state
-        vx, vy = get_virtual_mouse_pos()
-        is_hovered = self.rect.collidepoint(vx, vy)
-
-        current_color = self.hover_color if is_hovered else self.color
+        current_color = self.hover_color if self.is_hovered() else self.color
         pygame.draw.rect(surface, current_color, self.rect, border_radius=15)
         pygame.draw.rect(surface, (255, 255, 255), self.rect, 3, border_radius=15)
-        text_surf = self.font.render(self.text, True, (255, 255, 255))
+        text_surf = text_cache.render(self.font, self.text, (255, 255, 255))
         text_rect = text_surf.get_rect(center=self.rect.center)
         surface.blit(text_surf, text_rect)
 
-    def is_clicked(self):
+    def is_hovered(self):
         # We don't rely on event.pos directly, we rely on calculated virtual pos
         vx, vy = get_virtual_mouse_pos()
-        if self.rect.collidepoint(vx, vy):
-            return True
-        return False
+        return bool(self.rect.collidepoint(vx, vy))
+
+    def is_clicked(self):
+        # Called on a mouse button event, so hovering means clicked
+        return self.is_hovered()
 
 
 # --- Game Classes ---
-class Snake:
-    def __init__(self):
-        self.reset()
-
-    def reset(self):
-        self.body = [
-            (GRID_WIDTH // 2, GRID_HEIGHT // 2),
-            (GRID_WIDTH // 2 - 1, GRID_HEIGHT // 2),
-            (GRID_WIDTH // 2 - 2, GRID_HEIGHT // 2),
-            (GRID_WIDTH // 2 - 3, GRID_HEIGHT // 2),
-        ]
-        self.prev_body = list(self.body)
-        self.direction = (1, 0)
-        self.new_direction = (1, 0)
-        self.grow = False
-        self.alive = True
-        self.wrap_mode = False
+# The rules live in engine.py; these subclasses add input and drawing.
+class Snake(engine.Snake):
+    __slots__ = ()
 
     def handle_input(self, event):
+        """Returns True if the event queued a turn."""
         if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_UP and self.direction != (0, 1):
-                self.new_direction = (0, -1)
-            elif event.key == pygame.K_DOWN and self.direction != (0, -1):
-                self.new_direction = (0, 1)
-            elif event.key == pygame.K_LEFT and self.direction != (1, 0):
-                self.new_direction = (-1, 0)
-            elif event.key == pygame.K_RIGHT and self.direction != (-1, 0):
-                self.new_direction = (1, 0)
-
-    def shrink(self, amount):
-        current_len = len(self.body)
-        new_len = max(1, current_len - amount)
-        self.body = self.body[:new_len]
-        self.prev_body = self.prev_body[:new_len]
-
-    def update_logic(self):
-        if not self.alive:
-            return
-
-        self.prev_body = list(self.body)
-        self.direction = self.new_direction
-
-        head_x, head_y = self.body[0]
-        dx, dy = self.direction
-        new_head = (head_x + dx, head_y + dy)
-
-        if self.wrap_mode:
-            new_head = (new_head[0] % GRID_WIDTH, new_head[1] % GRID_HEIGHT)
-        else:
-            if (
-                new_head[0] < 0
-                or new_head[0] >= GRID_WIDTH
-                or new_head[1] < 0
-                or new_head[1] >= GRID_HEIGHT
-            ):
-                self.alive = False
-                sound_manager.play_crash()
-                return
-
-        if new_head in self.body:
-            self.alive = False
-            sound_manager.play_crash()
-            return
-
-        self.body.insert(0, new_head)
+            if event.key == pygame.K_UP:
+                return self.turn(engine.UP)
+            elif event.key == pygame.K_DOWN:
+                return self.turn(engine.DOWN)
+            elif event.key == pygame.K_LEFT:
+                return self.turn(engine.LEFT)
+            elif event.key == pygame.K_RIGHT:
+                return self.turn(engine.RIGHT)
+        return False
 
-        if not self.grow:
-            self.body.pop()
-        else:
-            self.grow = False
-            self.prev_body.append(self.prev_body[-1])
+    def _segments(self):
+        # Tail first: (index, cell, cell last tick, cell of the segment
+        # ahead), each as (x, y)
+        cells = [self.board.xy(cell) for cell in self.body]
+        last = len(cells) - 1
+        for i in range(last, -1, -1):
+            curr = cells[i]
+            if not self.moved:
+                prev = curr
+            elif i < last:
+                prev = cells[i + 1]
+            else:
+                prev = self.board.xy(self.prev_tail)
+            yield i, curr, prev, cells[i - 1] if i > 0 else None
+
+    def _neighbour(self, x, y, index):
+        # The adjacent cell (wrapping at the edges) holding segment index
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nx = (x + dx) % self.width
+            ny = (y + dy) % self.height
+            if self.segment_at(nx, ny) == index:
+                return nx, ny
+        return x, y
+
+    def _visible_segments(self, camera):
+        # Same as _segments but only for cells the camera sees, found by
+        # scanning the view instead of walking the whole body
+        x0, y0, x1, y1 = camera.visible_cells()
+        found = []
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                i = self.segment_at(x, y)
+                if i >= 0:
+                    found.append((i, x, y))
+        found.sort(reverse=True)
+        last = len(self.body) - 1
+        for i, x, y in found:
+            if not self.moved:
+                prev = (x, y)
+            elif i < last:
+                prev = self._neighbour(x, y, i + 1)
+            else:
+                prev = self.board.xy(self.prev_tail)
+            yield i, (x, y), prev, self._neighbour(x, y, i - 1) if i > 0 else None
 
-    def draw(self, surface, interpolation_alpha):
+    def draw(self, surface, interpolation_alpha, camera=None):
+        """Draws the snake and returns the list of rects it touched."""
         time_ticks = pygame.time.get_ticks()
         wiggle_amp = 4.0
         wiggle_freq = 0.6
         wiggle_speed = 0.01
 
-        for i in range(len(self.body) - 1, -1, -1):
-            curr_x, curr_y = self.body[i]
-            if i < len(self.prev_body):
-                prev_x, prev_y = self.prev_body[i]
-            else:
-                prev_x, prev_y = curr_x, curr_y
+        img_body = sprite_atlas.get("body")
+        drawn = []
+
+        if camera is None:
+            segments = self._segments()
+            cam_x = cam_y = 0
+        else:
+            segments = self._visible_segments(camera)
+            cam_x, cam_y = camera.x, camera.y
 
+        for i, (curr_x, curr_y), (prev_x, prev_y), ahead in segments:
             # Disable interpolation on wrap-around to prevent flying artifacts
             if abs(curr_x - prev_x) > 1 or abs(curr_y - prev_y) > 1:
                 exact_x = curr_x * GRID_SIZE
@@ -304,6 +577,8 @@ class Snake:
                     prev_y * GRID_SIZE
                     + (curr_y * GRID_SIZE - prev_y * GRID_SIZE) * interpolation_alpha
                 )
+            exact_x -= cam_x
+            exact_y -= cam_y
 
             if i > 0:
                 wave = (
@@ -312,12 +587,11 @@ class Snake:
             else:
                 wave = 0
 
-            if i == 0:
+            if ahead is None:
                 dx, dy = self.direction
             else:
-                p_x, p_y = self.body[i - 1]
-                dx = p_x - curr_x
-                dy = p_y - curr_y
+                dx = ahead[0] - curr_x
+                dy = ahead[1] - curr_y
 
             if abs(dx) > 1 or abs(dy) > 1:
                 pass
@@ -328,103 +602,186 @@ class Snake:
 
             if sprites_loaded:
                 if i == 0:
-                    angle = 0
-                    if self.direction == (1, 0):
-                        angle = -90
-                    elif self.direction == (-1, 0):
-                        angle = 90
-                    elif self.direction == (0, 1):
-                        angle = 180
-                    elif self.direction == (0, -1):
-                        angle = 0
-                    rotated_head = pygame.transform.rotate(img_head, angle)
+                    rotated_head = sprite_atlas.get("head", HEAD_ANGLES[self.direction])
                     rect = rotated_head.get_rect(
                         center=(exact_x + GRID_SIZE / 2, exact_y + GRID_SIZE / 2)
                     )
-                    surface.blit(rotated_head, rect)
+                    drawn.append(surface.blit(rotated_head, rect))
                 else:
                     offset = (img_body.get_width() - GRID_SIZE) / 2
-                    surface.blit(img_body, (exact_x - offset, exact_y - offset))
+                    drawn.append(
+                        surface.blit(img_body, (exact_x - offset, exact_y - offset))
+                    )
             else:
-                pygame.draw.circle(
-                    surface,
-                    (50, 205, 50),
-                    (int(exact_x + GRID_SIZE / 2), int(exact_y + GRID_SIZE / 2)),
-                    GRID_SIZE // 2 + 1,
+                drawn.append(
+                    pygame.draw.circle(
+                        surface,
+                        (50, 205, 50),
+                        (int(exact_x + GRID_SIZE / 2), int(exact_y + GRID_SIZE / 2)),
+                        GRID_SIZE // 2 + 1,
+                    )
                 )
+        return drawn
 
 
-class Item:
-    def __init__(self, img_sprite=None, fallback_color=(255, 255, 255)):
-        self.position = (-1, -1)
-        self.active = False
-        self.sprite = img_sprite
-        self.color = fallback_color
-
-    def spawn_random(self, occupied_positions):
-        attempts = 0
-        while attempts < 500:
-            x = random.randint(0, GRID_WIDTH - 1)
-            y = random.randint(0, GRID_HEIGHT - 1)
-            if (x, y) not in occupied_positions:
-                self.position = (x, y)
-                self.active = True
-                break
-            attempts += 1
+class Item(engine.Item):
+    __slots__ = ()
 
-    def draw(self, surface):
+    def draw(self, surface, animate=True, camera=None):
         if not self.active:
             return
         x, y = self.position
         pos_x = x * GRID_SIZE
         pos_y = y * GRID_SIZE
-        bob = math.sin(pygame.time.get_ticks() * 0.005) * 4
+        if camera is not None:
+            if not camera.sees_cell(x, y):
+                return
+            pos_x -= camera.x
+            pos_y -= camera.y
+        bob = math.sin(pygame.time.get_ticks() * 0.005) * 4 if animate else 0
 
-        if sprites_loaded and self.sprite:
-            surface.blit(self.sprite, (pos_x, pos_y + bob))
+        sprite = sprite_atlas.get(self.kind)
+        if sprites_loaded and sprite:
+            return surface.blit(sprite, (pos_x, pos_y + bob))
         else:
             center = (pos_x + GRID_SIZE // 2, int(pos_y + GRID_SIZE // 2 + bob))
-            pygame.draw.circle(surface, self.color, center, GRID_SIZE // 2)
-
-
-class BigRock:
-    def __init__(self, img_sprite):
-        self.position = (-1, -1)
-        self.active = False
-        self.sprite = img_sprite
-        self.footprint = []
-
-    def spawn_random(self, occupied_positions):
-        attempts = 0
-        while attempts < 500:
-            x = random.randint(0, GRID_WIDTH - 2)
-            y = random.randint(0, GRID_HEIGHT - 2)
-            proposed_area = [(x, y), (x + 1, y), (x, y + 1), (x + 1, y + 1)]
-
-            collision = False
-            for spot in proposed_area:
-                if spot in occupied_positions:
-                    collision = True
-                    break
+            return pygame.draw.circle(
+                surface, ITEM_COLORS[self.kind], center, GRID_SIZE // 2
+            )
 
-            if not collision:
-                self.position = (x, y)
-                self.footprint = proposed_area
-                self.active = True
-                break
-            attempts += 1
 
-    def draw(self, surface):
+class BigRock(engine.BigRock):
+    __slots__ = ()
+
+    def draw(self, surface, camera=None):
         if not self.active:
             return
         x, y = self.position
         pos_x = x * GRID_SIZE
         pos_y = y * GRID_SIZE
-        if sprites_loaded and self.sprite:
-            surface.blit(self.sprite, (pos_x, pos_y))
+        if camera is not None:
+            # The sprite spans three cells from its corner
+            if not camera.sees_cell(x + 1, y + 1, margin=2):
+                return
+            pos_x -= camera.x
+            pos_y -= camera.y
+        if sprites_loaded:
+            return surface.blit(sprite_atlas.get("rock"), (pos_x, pos_y))
         else:
             rect = pygame.Rect(pos_x, pos_y, GRID_SIZE * 2, GRID_SIZE * 2)
-            pygame.draw.rect(surface, (100, 100, 100), rect)
+            return pygame.draw.rect(surface, (100, 100, 100), rect)
+
+
+def build_background(wrap_mode):
+    layer = pygame.Surface((VIRTUAL_WIDTH, VIRTUAL_HEIGHT)).convert()
+    if bg_image:
+        layer.blit(bg_image, (0, 0))
+    else:
+        layer.fill(COLOR_BG)
+
+    if wrap_mode:
+        pygame.draw.rect(layer, (255, 215, 0), (0, 0, VIRTUAL_WIDTH, VIRTUAL_HEIGHT), 5)
+    else:
+        pygame.draw.rect(layer, (50, 50, 50), (0, 0, VIRTUAL_WIDTH, VIRTUAL_HEIGHT), 2)
+    return layer
+
+
+def toggle_trace():
+    """F8: starts recording a trace, or saves the one being recorded."""
+    if not frame_profiler.tracing:
+        frame_profiler.start_trace()
+        return
+    path = f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    try:
+        frame_profiler.stop_trace(path)
+        print(f"Frame trace saved to {path}")
+    except OSError as e:
+        print(f"Warning: could not save trace {path} ({e})")
+
+
+def draw_world_view(surface, game, alpha, camera, tile_image):
+    """
+    Large-board drawing: the camera follows the head and only cells it
+    sees are drawn, so the cost depends on the view, not the board.
+    """
+    snake = game.snake
+    xy = game.board.xy
+    head_x, head_y = xy(snake.body[0])
+    prev_x, prev_y = head_x, head_y
+    if snake.moved:
+        prev_x, prev_y = xy(snake.body[1] if len(snake.body) > 1 else snake.prev_tail)
+    if abs(head_x - prev_x) > 1 or abs(head_y - prev_y) > 1:
+        prev_x, prev_y = head_x, head_y
+    camera.follow(
+        (prev_x + (head_x - prev_x) * alpha + 0.5) * GRID_SIZE,
+        (prev_y + (head_y - prev_y) * alpha + 0.5) * GRID_SIZE,
+    )
+
+    if tile_image:
+        render.draw_tiled(surface, tile_image, camera.x, camera.y)
+    else:
+        surface.fill(COLOR_BG)
+    board_rect = (
+        -camera.x,
+        -camera.y,
+        snake.width * GRID_SIZE,
+        snake.height * GRID_SIZE,
+    )
+    if snake.wrap_mode:
+        pygame.draw.rect(surface, (255, 215, 0), board_rect, 5)
+    else:
+        pygame.draw.rect(surface, (50, 50, 50), board_rect, 2)
+
+    # Bombs and rocks come from the board's cell registry, so only the
+    # cells in view are looked at however many have piled up. Rock
+    # sprites reach past their 2x2 block, hence the wider margin.
+    board = game.board
+    entities = board.entities
+    x0, y0, x1, y1 = camera.visible_cells(margin=2)
+    for y in range(y0, y1):
+        row = y * board.width
+        for x in range(x0, x1):
+            e = entities[row + x]
+            if e is None:
+                continue
+            if e.kind == "bomb":
+                e.draw(surface, animate=False, camera=camera)
+            elif e.kind == "rock" and e.position == (x, y):
+                e.draw(surface, camera=camera)
+    game.apple.draw(surface, camera=camera)
+    game.cookie.draw(surface, camera=camera)
+    game.banana.draw(surface, camera=camera)
+    game.star.draw(surface, camera=camera)
+    snake.draw(surface, alpha, camera)
+
+
+class Game(engine.GameState):
+    snake_cls = Snake
+    item_cls = Item
+    rock_cls = BigRock
+
+
+# --- Startup ---
+def init():
+    """Opens the window and the mixer and loads the assets, once."""
+    global presenter, game_surface, clock, sound_manager
+    if presenter is not None:
+        return
+    pygame.init()
+    pygame.mixer.init()
+
+    presenter = render.PRESENTERS[PRESENT_BACKEND](
+        (VIRTUAL_WIDTH, VIRTUAL_HEIGHT), COLOR_LETTERBOX
+    )
+    pygame.display.set_caption("Snake 2.0 - Python Snake Game")
+    game_surface = presenter.game_surface
+    presenter.profiler = frame_profiler
+    clock = pygame.time.Clock()
+
+    load_assets()
+    sound_manager = SoundManager()
+    # Also on a crash, so the run that caused it can be replayed
+    atexit.register(replay_log.finish)
 
 
 # --- Game States ---
@@ -434,31 +791,25 @@ STATE_INSTRUCTION = 2
 STATE_PAUSE = 3
 STATE_GAMEOVER = 4
 
+ARROW_KEYS = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+
 
 # --- Main Game Loop ---
 def main():
+    init()
     current_state = STATE_MENU
 
-    snake = Snake()
-    apple = Item(img_apple, (255, 50, 50))
-    banana = Item(img_banana, (210, 180, 140))
-    cookie = Item(img_cookie, (210, 180, 140))
-    star = Item(img_star, (255, 255, 0))
+    game = Game(width=BOARD_WIDTH, height=BOARD_HEIGHT)
+    snake = game.snake
+    apple = game.apple
+    banana = game.banana
+    cookie = game.cookie
+    star = game.star
 
-    bombs = []
-    rocks = []
-
-    score = 0
-    move_delay = START_MOVE_DELAY
-    last_move_time = pygame.time.get_ticks()
-
-    apples_eaten_count = 0
-    rock_milestone = SCORE_FOR_ROCK
-    star_end_time = 0
-
-    font_score = pygame.font.SysFont("comicsansms", 30, bold=True)
-    font_title = pygame.font.SysFont("comicsansms", 72, bold=True)
-    font_inst = pygame.font.SysFont("comicsansms", 26)
+    font_score = fonts.get("comicsansms", 30, bold=True)
+    font_title = fonts.get("comicsansms", 72, bold=True)
+    font_inst = fonts.get("comicsansms", 26)
+    font_profiler = fonts.get("couriernew,monospace", 14)
 
     btn_w, btn_h = 200, 50
     cx = VIRTUAL_WIDTH // 2 - btn_w // 2
@@ -475,47 +826,92 @@ def main():
     menu_buttons = [btn_new_game, btn_inst, btn_quit]
     pause_buttons = [btn_pause_resume, btn_pause_new, btn_pause_inst, btn_pause_quit]
 
-    def get_occupied():
-        occ = set(snake.body)
-        if apple.active:
-            occ.add(apple.position)
-        if cookie.active:
-            occ.add(cookie.position)
-        if banana.active:
-            occ.add(banana.position)
-        if star.active:
-            occ.add(star.position)
-        for b in bombs:
-            if b.active:
-                occ.add(b.position)
-        for r in rocks:
-            if r.active:
-                for spot in r.footprint:
-                    occ.add(spot)
-        return occ
+    # Background plus border, one per wrap mode
+    background_layers = {
+        False: build_background(False),
+        True: build_background(True),
+    }
+    # Boards bigger than the screen scroll with a camera instead
+    camera = None
+    tile_image = bg_image
+    if (BOARD_WIDTH, BOARD_HEIGHT) != (GRID_WIDTH, GRID_HEIGHT):
+        camera = render.Camera(
+            VIRTUAL_WIDTH, VIRTUAL_HEIGHT, BOARD_WIDTH, BOARD_HEIGHT, GRID_SIZE
+        )
+
+    static_layer = pygame.Surface((VIRTUAL_WIDTH, VIRTUAL_HEIGHT)).convert()
+
+    # Translucent screens over the pause and game over views, made once
+    pause_overlay = pygame.Surface((VIRTUAL_WIDTH, VIRTUAL_HEIGHT), pygame.SRCALPHA)
+    pause_overlay.fill((0, 0, 0, 128))
+    gameover_overlay = pygame.Surface((VIRTUAL_WIDTH, VIRTUAL_HEIGHT), pygame.SRCALPHA)
+    gameover_overlay.fill((50, 0, 0, 128))
+    static_layer_key = None
+    dirty = render.DirtyRenderer(VIRTUAL_WIDTH, VIRTUAL_HEIGHT, GRID_SIZE)
+    dirty.set_background(static_layer)
+    use_dirty_rects = USE_DIRTY_RECTS
+    atlas_warm = False
+
+    pilot = autopilot.Autopilot()
+    use_autopilot = ATTRACT_MODE
+    gameover_time = 0
+    if ATTRACT_MODE:
+        replay_log.new_run(game, pygame.time.get_ticks())
+        current_state = STATE_GAME
+
+    # What the last frame showed, so idle screens know when to redraw
+    drawn_state = None
+    drawn_hover = None
+    needs_redraw = True
 
     running = True
     while running:
+        if IDLE_REDRAW and current_state != STATE_GAME and not needs_redraw:
+            # Nothing on this screen moves: sleep until there is input
+            first = pygame.event.wait(IDLE_WAIT_MS)
+            events = [] if first.type == pygame.NOEVENT else [first]
+            events.extend(pygame.event.get())
+            frame_profiler.reset_frame()
+        else:
+            events = pygame.event.get()
+        frame_profiler.begin_frame()
         current_time = pygame.time.get_ticks()
 
         # 1. Event Handling
-        for event in pygame.event.get():
+        for event in events:
+            if event.type != pygame.MOUSEMOTION:
+                needs_redraw = True
+
             if event.type == pygame.QUIT:
                 running = False
 
+            # The display format can change with the window
+            if event.type == pygame.VIDEORESIZE:
+                sprite_atlas.clear()
+                dirty.invalidate()
+
             # Fullscreen Toggle Logic
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_F11:
-                    is_fullscreen = pygame.display.is_fullscreen()
-                    if is_fullscreen:
-                        pygame.display.set_mode(
-                            (VIRTUAL_WIDTH, VIRTUAL_HEIGHT), pygame.RESIZABLE
-                        )
-                    else:
-                        pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+                    presenter.toggle_fullscreen()
+                    sprite_atlas.clear()
+                    dirty.invalidate()
+                elif event.key == pygame.K_F10:
+                    use_dirty_rects = not use_dirty_rects
+                elif event.key == pygame.K_F9:
+                    frame_profiler.toggle_overlay()
+                    dirty.invalidate()
+                elif event.key == pygame.K_F8:
+                    toggle_trace()
+                elif event.key == pygame.K_F7:
+                    use_autopilot = not use_autopilot
+                    pilot.reset()
 
             if current_state == STATE_GAME:
-                snake.handle_input(event)
+                if event.type == pygame.KEYDOWN and event.key in ARROW_KEYS:
+                    use_autopilot = False
+                if snake.handle_input(event):
+                    frame_profiler.note_input()
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     current_state = STATE_PAUSE
 
@@ -525,19 +921,8 @@ def main():
                         if btn.is_clicked():  # Using virtual mouse internally
                             if btn.action_code == "new":
                                 sound_manager.stop_powerup_loop()
-                                snake.reset()
-                                score = 0
-                                move_delay = START_MOVE_DELAY
-                                last_move_time = current_time
-                                apples_eaten_count = 0
-                                bombs = []
-                                rocks = []
-                                rock_milestone = SCORE_FOR_ROCK
-                                cookie.active = False
-                                banana.active = False
-                                star.active = False
-                                star_end_time = 0
-                                apple.spawn_random(get_occupied())
+                                replay_log.new_run(game, current_time)
+                                frame_profiler.clear_inputs()
                                 current_state = STATE_GAME
                             elif btn.action_code == "inst":
                                 current_state = STATE_INSTRUCTION
@@ -549,34 +934,24 @@ def main():
                     for btn in pause_buttons:
                         if btn.is_clicked():
                             if btn.action_code == "resume":
-                                last_move_time = current_time
+                                game.last_move_time = current_time
                                 current_state = STATE_GAME
                             elif btn.action_code == "new":
-                                snake.reset()
-                                score = 0
-                                move_delay = START_MOVE_DELAY
-                                last_move_time = current_time
-                                apples_eaten_count = 0
-                                bombs = []
-                                rocks = []
-                                rock_milestone = SCORE_FOR_ROCK
-                                cookie.active = False
-                                banana.active = False
-                                star.active = False
-                                star_end_time = 0
-                                apple.spawn_random(get_occupied())
+                                sound_manager.stop_powerup_loop()
+                                replay_log.new_run(game, current_time)
+                                frame_profiler.clear_inputs()
                                 current_state = STATE_GAME
                             elif btn.action_code == "inst":
                                 current_state = STATE_INSTRUCTION
                             elif btn.action_code == "quit":
                                 running = False
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                    last_move_time = current_time
+                    game.last_move_time = current_time
                     current_state = STATE_GAME
 
             elif current_state == STATE_INSTRUCTION:
                 if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                    if snake.alive and score > 0:
+                    if snake.alive and game.score > 0:
                         current_state = STATE_PAUSE
                     else:
                         current_state = STATE_MENU
@@ -584,124 +959,112 @@ def main():
             elif current_state == STATE_GAMEOVER:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_RETURN:
-                        snake.reset()
-                        score = 0
-                        move_delay = START_MOVE_DELAY
-                        last_move_time = current_time
-                        apples_eaten_count = 0
-                        bombs = []
-                        rocks = []
-                        rock_milestone = SCORE_FOR_ROCK
-                        cookie.active = False
-                        banana.active = False
-                        star.active = False
-                        star_end_time = 0
-                        apple.spawn_random(get_occupied())
+                        sound_manager.stop_powerup_loop()
+                        replay_log.new_run(game, current_time)
+                        frame_profiler.clear_inputs()
                         current_state = STATE_GAME
                     elif event.key == pygame.K_ESCAPE:
                         current_state = STATE_MENU
 
+        frame_profiler.lap("events")
+
         # 2. Logic Update
         alpha = 0.0
 
         if current_state == STATE_GAME:
-            if current_time < star_end_time:
-                snake.wrap_mode = True
-            else:
-                sound_manager.stop_powerup_loop()
-                snake.wrap_mode = False
-
-            time_since_move = current_time - last_move_time
-            if time_since_move >= move_delay:
-                snake.update_logic()
-                last_move_time = current_time
-                time_since_move = 0
-                head = snake.body[0]
-
-                if score >= rock_milestone:
-                    r = BigRock(img_rock if sprites_loaded else None)
-                    r.spawn_random(get_occupied())
-                    rocks.append(r)
-                    rock_milestone += SCORE_FOR_ROCK
-
-                # Interactions
-                if head == apple.position:
-                    snake.grow = True
-                    score += 10
-                    sound_manager.play_eat()
-                    move_delay = max(MIN_MOVE_DELAY, move_delay - DELAY_DECREMENT)
-                    apples_eaten_count += 1
-
-                    if apples_eaten_count % APPLES_FOR_EVENT == 0:
-                        cookie.spawn_random(get_occupied())
-                        banana.spawn_random(get_occupied())
-                        for _ in range(4):
-                            b = Item(img_bomb, (0, 0, 0))
-                            b.spawn_random(get_occupied())
-                            bombs.append(b)
-
-                    if not star.active and current_time > star_end_time:
-                        if random.random() < 0.15:
-                            star.spawn_random(get_occupied())
-                    apple.spawn_random(get_occupied())
-
-                if cookie.active and head == cookie.position:
-                    score += 50
-                    sound_manager.play_bonus()
-                    cookie.active = False
-
-                if banana.active and head == banana.position:
-                    score += 20
-                    sound_manager.play_bonus()
-                    banana.active = False
-
-                if star.active and head == star.position:
-                    sound_manager.play_powerup()
-                    sound_manager.start_powerup_loop()
-                    star_end_time = current_time + STAR_DURATION
-                    star.active = False
-
-                for b in bombs[:]:
-                    if b.active and head == b.position:
-                        sound_manager.play_explode()
-                        if len(snake.body) <= 4:
-                            snake.alive = False
-                        else:
-                            snake.shrink(4)
-                        b.active = False
-                        bombs.remove(b)
-
-                for r in rocks:
-                    if r.active and (head in r.footprint):
-                        sound_manager.play_crash()
-                        snake.alive = False
+            # Fixed timestep: run every logic tick that has come due since
+            # the last frame, each at its own time on the logic clock, so
+            # speed isn't capped by the frame rate and hitches catch up.
+            # step() runs the timers at that tick's time
+            ticks = 0
+            while game.is_move_due(current_time):
+                if ticks == MAX_CATCH_UP_TICKS:
+                    # Too far behind (a long stall): drop the backlog
+                    # instead of spiralling
+                    game.last_move_time = current_time
+                    break
+                if use_autopilot:
+                    # Turned before the recorder looks, so replays keep it
+                    action = pilot(game)
+                    if action is not None:
+                        snake.turn(action)
+                replay_log.before_step()
+                heading = snake.direction
+                for game_event in game.step():
+                    sound_manager.play_event(game_event)
+                if snake.direction != heading:
+                    frame_profiler.input_applied()
+                ticks += 1
 
                 if not snake.alive:
                     sound_manager.stop_powerup_loop()
+                    replay_log.finish()
                     current_state = STATE_GAMEOVER
+                    gameover_time = current_time
+                    break
+            if snake.alive:
+                # Only after the ticks, so the clock never runs backwards:
+                # the star can run out between ticks too
+                for game_event in game.update_timers(current_time):
+                    sound_manager.play_event(game_event)
+
+            alpha = game.interpolation_alpha(current_time)
+        elif current_state == STATE_GAMEOVER and use_autopilot:
+            if current_time - gameover_time >= AUTOPILOT_RESTART_MS:
+                replay_log.new_run(game, current_time)
+                frame_profiler.clear_inputs()
+                pilot.reset()
+                current_state = STATE_GAME
+        frame_profiler.lap("logic")
 
-            alpha = time_since_move / move_delay
-            if alpha > 1.0:
-                alpha = 1.0
-
-        # 3. Drawing (Draw to Virtual Surface)
-        if bg_image:
-            game_surface.blit(bg_image, (0, 0))
+        if current_state == STATE_MENU:
+            buttons = menu_buttons
+        elif current_state == STATE_PAUSE:
+            buttons = pause_buttons
         else:
-            game_surface.fill(COLOR_BG)
+            buttons = ()
+        hover = next((btn for btn in buttons if btn.is_hovered()), None)
+        if current_state != drawn_state or hover is not drawn_hover:
+            needs_redraw = True
+        if IDLE_REDRAW and current_state != STATE_GAME and not needs_redraw:
+            continue
 
-        if snake.wrap_mode:
-            pygame.draw.rect(
-                game_surface, (255, 215, 0), (0, 0, VIRTUAL_WIDTH, VIRTUAL_HEIGHT), 5
-            )
+        # 3. Drawing (Draw to Virtual Surface)
+        # Background, border, rocks and bombs only change on game events,
+        # so they are composited once into the static layer
+        static_key = (game.static_version, snake.wrap_mode)
+        if camera is None and static_key != static_layer_key:
+            static_layer.blit(background_layers[snake.wrap_mode], (0, 0))
+            for b in game.bombs.values():
+                b.draw(static_layer, animate=False)
+            for r in game.rocks:
+                r.draw(static_layer)
+            static_layer_key = static_key
+            dirty.invalidate()
+
+        # Only gameplay frames are dirty-rect rendered; every other screen,
+        # and the first game frame after one, is drawn and pushed in full
+        dirty_mode = use_dirty_rects and camera is None and current_state == STATE_GAME
+        if dirty_mode:
+            dirty.restore(game_surface)
+        elif current_state == STATE_MENU:
+            dirty.invalidate()
+            game_surface.blit(background_layers[snake.wrap_mode], (0, 0))
+        elif camera is not None and current_state != STATE_INSTRUCTION:
+            # Large board: the whole world view scrolls, so draw it fresh
+            if current_state == STATE_PAUSE:
+                alpha = 0.0
+            elif current_state == STATE_GAMEOVER:
+                alpha = 1.0
+            draw_world_view(game_surface, game, alpha, camera, tile_image)
         else:
-            pygame.draw.rect(
-                game_surface, (50, 50, 50), (0, 0, VIRTUAL_WIDTH, VIRTUAL_HEIGHT), 2
-            )
+            dirty.invalidate()
+            game_surface.blit(static_layer, (0, 0))
+        frame_profiler.lap("draw.scenery")
 
         if current_state == STATE_MENU:
-            title_surf = font_title.render("Snake 2.0", True, (255, 105, 180))
-            title_shadow = font_title.render("Snake 2.0", True, (100, 100, 100))
+            title_surf = text_cache.render(font_title, "Snake 2.0", (255, 105, 180))
+            title_shadow = text_cache.render(font_title, "Snake 2.0", (100, 100, 100))
             game_surface.blit(
                 title_shadow,
                 (VIRTUAL_WIDTH // 2 - title_surf.get_width() // 2 + 3, 103),
@@ -713,38 +1076,41 @@ def main():
                 btn.draw(game_surface)
 
         elif current_state == STATE_GAME:
-            apple.draw(game_surface)
-            cookie.draw(game_surface)
-            banana.draw(game_surface)
-            star.draw(game_surface)
-            for b in bombs:
-                b.draw(game_surface)
-            for r in rocks:
-                r.draw(game_surface)
-            snake.draw(game_surface, alpha)
-
-            score_text = font_score.render(f"Score: {score}", True, COLOR_TEXT)
-            game_surface.blit(score_text, (20, 20))
-            if current_time < star_end_time:
-                remaining_sec = math.ceil((star_end_time - current_time) / 1000)
-                timer_text = font_score.render(
-                    f"Powerups : {remaining_sec}s", True, COLOR_TIMER
+            if camera is None:
+                dirty.mark(apple.draw(game_surface))
+                dirty.mark(cookie.draw(game_surface))
+                dirty.mark(banana.draw(game_surface))
+                dirty.mark(star.draw(game_surface))
+                frame_profiler.lap("draw.items")
+                dirty.mark_all(snake.draw(game_surface, alpha))
+                frame_profiler.lap("draw.snake")
+
+            dirty.mark(
+                text_cache.blit_number(
+                    game_surface,
+                    font_score,
+                    "Score: ",
+                    game.score,
+                    COLOR_TEXT,
+                    (20, 20),
+                )
+            )
+            if current_time < game.star_end_time:
+                remaining_sec = math.ceil((game.star_end_time - current_time) / 1000)
+                timer_text = text_cache.render(
+                    font_score, f"Powerups : {remaining_sec}s", COLOR_TIMER
                 )
-                game_surface.blit(timer_text, (20, 55))
+                dirty.mark(game_surface.blit(timer_text, (20, 55)))
+            frame_profiler.lap("draw.text")
 
         elif current_state == STATE_PAUSE:
-            apple.draw(game_surface)
-            cookie.draw(game_surface)
-            star.draw(game_surface)
-            for b in bombs:
-                b.draw(game_surface)
-            for r in rocks:
-                r.draw(game_surface)
-            snake.draw(game_surface, 0.0)
-            overlay = pygame.Surface((VIRTUAL_WIDTH, VIRTUAL_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 128))
-            game_surface.blit(overlay, (0, 0))
-            status_text = font_title.render("Game Paused", True, (255, 255, 255))
+            if camera is None:
+                apple.draw(game_surface)
+                cookie.draw(game_surface)
+                star.draw(game_surface)
+                snake.draw(game_surface, 0.0)
+            game_surface.blit(pause_overlay, (0, 0))
+            status_text = text_cache.render(font_title, "Game Paused", (255, 255, 255))
             game_surface.blit(
                 status_text, (VIRTUAL_WIDTH // 2 - status_text.get_width() // 2, 100)
             )
@@ -753,7 +1119,7 @@ def main():
 
         elif current_state == STATE_INSTRUCTION:
             game_surface.fill((255, 253, 208))
-            inst_title = font_title.render("How to Play", True, COLOR_TEXT)
+            inst_title = text_cache.render(font_title, "How to Play", COLOR_TEXT)
             game_surface.blit(
                 inst_title, (VIRTUAL_WIDTH // 2 - inst_title.get_width() // 2, 50)
             )
@@ -766,44 +1132,47 @@ def main():
                 "ESC to Pause. F11 for Fullscreen.",
             ]
             for i, line in enumerate(lines):
-                txt = font_inst.render(line, True, COLOR_TEXT)
+                txt = text_cache.render(font_inst, line, COLOR_TEXT)
                 game_surface.blit(
                     txt, (VIRTUAL_WIDTH // 2 - txt.get_width() // 2, 150 + i * 40)
                 )
 
         elif current_state == STATE_GAMEOVER:
-            apple.draw(game_surface)
-            for b in bombs:
-                b.draw(game_surface)
-            for r in rocks:
-                r.draw(game_surface)
-            snake.draw(game_surface, 1.0)
-            overlay = pygame.Surface((VIRTUAL_WIDTH, VIRTUAL_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((50, 0, 0, 128))
-            game_surface.blit(overlay, (0, 0))
-            msg1 = font_title.render("Game Over!", True, (255, 255, 0))
-            msg2 = font_score.render(f"Final Score: {score}", True, (255, 255, 255))
-            msg3 = font_inst.render("Press ENTER to Restart", True, (200, 200, 200))
+            if camera is None:
+                apple.draw(game_surface)
+                snake.draw(game_surface, 1.0)
+            game_surface.blit(gameover_overlay, (0, 0))
+            msg1 = text_cache.render(font_title, "Game Over!", (255, 255, 0))
+            msg2 = text_cache.render(
+                font_score, f"Final Score: {game.score}", (255, 255, 255)
+            )
+            msg3 = text_cache.render(
+                font_inst, "Press ENTER to Restart", (200, 200, 200)
+            )
             game_surface.blit(msg1, (VIRTUAL_WIDTH // 2 - msg1.get_width() // 2, 200))
             game_surface.blit(msg2, (VIRTUAL_WIDTH // 2 - msg2.get_width() // 2, 280))
             game_surface.blit(msg3, (VIRTUAL_WIDTH // 2 - msg3.get_width() // 2, 350))
 
-        # --- Scale and Draw to Real Screen ---
-        screen.fill(COLOR_LETTERBOX)  # Fill black bars
-
-        real_w, real_h = screen.get_size()
-        scale = min(real_w / VIRTUAL_WIDTH, real_h / VIRTUAL_HEIGHT)
-        new_w = int(VIRTUAL_WIDTH * scale)
-        new_h = int(VIRTUAL_HEIGHT * scale)
+        frame_profiler.lap("draw.screens")
+        dirty.mark(frame_profiler.draw_overlay(game_surface, font_profiler))
 
-        scaled_surf = pygame.transform.scale(game_surface, (new_w, new_h))
-        offset_x = (real_w - new_w) // 2
-        offset_y = (real_h - new_h) // 2
-
-        screen.blit(scaled_surf, (offset_x, offset_y))
-
-        pygame.display.flip()
-        clock.tick(60)
+        # --- Scale and Draw to Real Screen ---
+        if dirty_mode:
+            dirty.present(presenter)
+        else:
+            presenter.present()
+        frame_profiler.frame_presented()
+        clock.tick(RENDER_FPS)
+        frame_profiler.lap("wait")
+        drawn_state = current_state
+        drawn_hover = hover
+        needs_redraw = False
+
+        # The first frame goes up before any sprite is decoded; the rest
+        # are readied behind the menu rather than mid-game
+        if not atlas_warm:
+            sprite_atlas.warm()
+            atlas_warm = True
 
     pygame.quit()
     sys.exit()
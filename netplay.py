@@ -0,0 +1,577 @@
+"""
+Networked play: an asyncio server running many independent arenas, each
+one engine.GameState with its own snake, plus a loopback client.
+
+Every arena steps on its own move_delay, but none of them has a task of
+its own: one driver task wakes every WHEEL_RESOLUTION_MS, pulls the
+arenas that have come due off a shared timer wheel, steps them, and puts
+each back in at its next move time. How late each tick ran (tick lag) is
+recorded and reported every REPORT_SECONDS.
+
+Wire format over TCP: every message is a u16 little-endian length and a
+payload, whose first byte is its type. Numbers in payloads are varints
+(see replay.py) and cells are packed as y * width + x.
+
+Client to server:
+    J arena seed   join arena (0 for a new one), seed + 1 (0 for random)
+    T code         turn: 0-3 for up, down, left, right
+    R              restart the arena after its snake died
+
+The client that made an arena owns it. Clients that join an existing
+arena by id only watch: their T and R messages are ignored.
+
+Server to client:
+    S  full snapshot, sent on join and restart:
+       arena tick width height score alive wrap length body-cells...
+       4 x item (cell + 1, 0 when inactive) for apple, cookie, banana,
+       star, then count + bomb cells, count + rock corner cells
+    D  one tick as a delta against the previous one: a flags byte, then
+       if MOVED       the new head cell and how many tail cells to drop
+       if ITEMS       a byte with one bit per item that changed, then
+                      the new cell + 1 of each
+       if STATIC      bombs added, bombs removed, rocks added, rocks
+                      removed, each a count and cells
+       if SCORE       the new score
+       DIED and WRAP are plain flags.
+
+A quiet tick is two bytes of payload; a snapshot is only resent on
+join and restart.
+
+Usage:
+    python netplay.py serve [--port 7777]
+    python netplay.py loadtest [--arenas 300] [--seconds 10]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import struct
+import time
+from collections import deque
+
+import engine
+from replay import read_varint, write_varint
+
+DEFAULT_PORT = 7777
+WHEEL_RESOLUTION_MS = 5
+WHEEL_SLOTS = 512
+REPORT_SECONDS = 5.0
+# A client this far behind on reading is dropped rather than buffered for
+MAX_CLIENT_BUFFER = 256 * 1024
+
+ITEMS = ("apple", "cookie", "banana", "star")
+
+FLAG_MOVED = 1
+FLAG_ITEMS = 2
+FLAG_STATIC = 4
+FLAG_SCORE = 8
+FLAG_DIED = 16
+FLAG_WRAP = 32
+
+
+def frame(payload):
+    return struct.pack("<H", len(payload)) + payload
+
+
+async def read_frame(reader):
+    (length,) = struct.unpack("<H", await reader.readexactly(2))
+    return await reader.readexactly(length)
+
+
+def read_varints(data, pos, count):
+    values = []
+    for _ in range(count):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values, pos
+
+
+# --- Timer Wheel ---
+class TimerWheel:
+    """
+    Hashed timing wheel: an entry due at t ms goes in slot
+    (t // resolution) % slots. Scheduling is O(1), and advancing only
+    looks at the slots whose time has passed. Entries more than one turn
+    of the wheel ahead stay in their slot until their turn comes round.
+    """
+
+    def __init__(self, resolution=WHEEL_RESOLUTION_MS, slots=WHEEL_SLOTS):
+        self.resolution = resolution
+        self.slots = [[] for _ in range(slots)]
+        self.cursor = 0  # Absolute index of the next slot to expire
+        self.count = 0
+
+    def schedule(self, due, item):
+        index = max(int(due // self.resolution), self.cursor)
+        self.slots[index % len(self.slots)].append((due, index, item))
+        self.count += 1
+
+    def expire(self, now):
+        """Removes and returns (due, item) for everything due by now."""
+        expired = []
+        last = int(now // self.resolution)
+        slots = self.slots
+        while self.cursor <= last:
+            slot = slots[self.cursor % len(slots)]
+            if slot:
+                keep = []
+                for entry in slot:
+                    if entry[1] <= self.cursor and entry[0] <= now:
+                        expired.append((entry[0], entry[2]))
+                    else:
+                        keep.append(entry)
+                slot[:] = keep
+            if self.cursor == last:
+                # The slot now falls in may still hold entries due later
+                break
+            self.cursor += 1
+        self.count -= len(expired)
+        return expired
+
+
+# --- Arenas ---
+class Arena:
+    """
+    One game and the clients watching it; encodes each tick as a delta.
+    Only the owner (the client that made it) steers and restarts it.
+    """
+
+    def __init__(self, arena_id, seed, now, owner=None):
+        self.id = arena_id
+        self.seed = seed
+        self.owner = owner
+        self.game = engine.GameState(seed=seed)
+        self.game.reset(now)
+        self.ticks = 0
+        self.clients = set()
+        self._remember()
+
+    def _items(self):
+        game = self.game
+        w = game.board.width
+        return [
+            (item.position[1] * w + item.position[0] + 1) if item.active else 0
+            for item in (game.apple, game.cookie, game.banana, game.star)
+        ]
+
+    def _static(self):
+        w = self.game.board.width
+        bombs = {y * w + x for x, y in self.game.bombs}
+        rocks = {r.position[1] * w + r.position[0] for r in self.game.rocks if r.active}
+        return bombs, rocks
+
+    def _remember(self):
+        game = self.game
+        self.items = self._items()
+        self.bombs, self.rocks = self._static()
+        self.static_version = game.static_version
+        self.score = game.score
+
+    def restart(self, now):
+        self.game.reset(now)
+        self.ticks = 0
+        self._remember()
+
+    @property
+    def next_due(self):
+        return self.game.last_move_time + self.game.move_delay
+
+    def snapshot(self):
+        game = self.game
+        snake = game.snake
+        w = game.board.width
+        out = bytearray(b"S")
+        for value in (
+            self.id,
+            self.ticks,
+            w,
+            game.board.height,
+            game.score,
+            snake.alive,
+            snake.wrap_mode,
+            len(snake.body),
+        ):
+            write_varint(out, int(value))
+        for cell in snake.body:
+            write_varint(out, cell)
+        for cell in self.items:
+            write_varint(out, cell)
+        for cells in (self.bombs, self.rocks):
+            write_varint(out, len(cells))
+            for cell in sorted(cells):
+                write_varint(out, cell)
+        return frame(bytes(out))
+
+    def tick(self, now):
+        """Steps the game and returns the delta frame for it."""
+        game = self.game
+        snake = game.snake
+        length = len(snake.body)
+        game.step(now=now)
+        self.ticks += 1
+
+        flags = 0
+        out = bytearray(b"D\0")
+        if snake.moved:
+            flags |= FLAG_MOVED
+            write_varint(out, snake.body[0])
+            write_varint(out, length + 1 - len(snake.body))
+        items = self._items()
+        if items != self.items:
+            flags |= FLAG_ITEMS
+            mask = 0
+            for i, (old, new) in enumerate(zip(self.items, items)):
+                if old != new:
+                    mask |= 1 << i
+            out.append(mask)
+            for i, cell in enumerate(items):
+                if mask & (1 << i):
+                    write_varint(out, cell)
+            self.items = items
+        if game.static_version != self.static_version:
+            flags |= FLAG_STATIC
+            bombs, rocks = self._static()
+            for cells in (
+                bombs - self.bombs,
+                self.bombs - bombs,
+                rocks - self.rocks,
+                self.rocks - rocks,
+            ):
+                write_varint(out, len(cells))
+                for cell in cells:
+                    write_varint(out, cell)
+            self.bombs, self.rocks = bombs, rocks
+            self.static_version = game.static_version
+        if game.score != self.score:
+            flags |= FLAG_SCORE
+            write_varint(out, game.score)
+            self.score = game.score
+        if not snake.alive:
+            flags |= FLAG_DIED
+        if snake.wrap_mode:
+            flags |= FLAG_WRAP
+        out[1] = flags
+        return frame(bytes(out))
+
+
+# --- Server ---
+class ArenaServer:
+    def __init__(self, report_seconds=REPORT_SECONDS):
+        self.arenas = {}
+        self.next_id = 1
+        self.wheel = TimerWheel()
+        self.lag = deque(maxlen=50_000)
+        self.ticks = 0
+        self.bytes_out = 0
+        self.report_seconds = report_seconds
+        self.start = None
+        self.server = None
+        self.driver = None
+
+    def clock(self):
+        """Milliseconds since the server started; the arenas' logic clock."""
+        return (time.perf_counter() - self.start) * 1000
+
+    async def start_serving(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.start = time.perf_counter()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.driver = asyncio.create_task(self._drive())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.driver is not None:
+            self.driver.cancel()
+            try:
+                await self.driver
+            except asyncio.CancelledError:
+                pass
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def _send(self, arena, data):
+        for writer in list(arena.clients):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                arena.clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(data)
+            self.bytes_out += len(data)
+
+    async def _drive(self):
+        """The one task that ticks every arena."""
+        wheel = self.wheel
+        resolution = wheel.resolution
+        next_report = time.perf_counter() + self.report_seconds
+        while True:
+            now = self.clock()
+            for due, arena in wheel.expire(now):
+                if arena.id not in self.arenas or not arena.game.snake.alive:
+                    continue
+                self.lag.append(now - due)
+                self._send(arena, arena.tick(due))
+                self.ticks += 1
+                if arena.game.snake.alive:
+                    wheel.schedule(arena.next_due, arena)
+            if self.report_seconds and time.perf_counter() >= next_report:
+                print(self.report())
+                next_report += self.report_seconds
+            await asyncio.sleep((resolution - self.clock() % resolution) / 1000)
+
+    def lag_stats(self):
+        """(p50, p99, max) tick lag in ms since the last report."""
+        values = list(self.lag)
+        if not values:
+            return 0.0, 0.0, 0.0
+        if len(values) == 1:
+            return values[0], values[0], values[0]
+        cuts = statistics.quantiles(values, n=100)
+        return cuts[49], cuts[98], max(values)
+
+    def report(self):
+        p50, p99, worst = self.lag_stats()
+        self.lag.clear()
+        clients = sum(len(a.clients) for a in self.arenas.values())
+        return (
+            f"{len(self.arenas)} arenas, {clients} clients, {self.ticks} ticks, "
+            f"{self.bytes_out:,} bytes out, tick lag p50 {p50:.2f} p99 {p99:.2f} "
+            f"max {worst:.2f} ms"
+        )
+
+    def _join(self, arena_id, seed, writer):
+        arena = self.arenas.get(arena_id)
+        if arena is None:
+            arena_id = self.next_id
+            self.next_id += 1
+            if seed is None:
+                seed = random.getrandbits(32)
+            arena = self.arenas[arena_id] = Arena(
+                arena_id, seed, self.clock(), owner=writer
+            )
+            self.wheel.schedule(arena.next_due, arena)
+        arena.clients.add(writer)
+        writer.write(arena.snapshot())
+        return arena
+
+    def _leave(self, arena, writer):
+        arena.clients.discard(writer)
+        if arena.owner is writer:
+            # Nobody steers it from now on; watchers see it play out
+            arena.owner = None
+        if not arena.clients:
+            # Nobody left: the arena is dropped, and the wheel skips it
+            # when its tick comes up
+            self.arenas.pop(arena.id, None)
+
+    async def _handle(self, reader, writer):
+        arena = None
+        try:
+            while True:
+                payload = await read_frame(reader)
+                kind = payload[:1]
+                if kind == b"J":
+                    (arena_id, seed), _ = read_varints(payload, 1, 2)
+                    if arena is not None:
+                        self._leave(arena, writer)
+                    arena = self._join(arena_id, seed - 1 if seed else None, writer)
+                elif arena is None or arena.owner is not writer:
+                    # Not in an arena yet, or only watching this one
+                    continue
+                elif (
+                    kind == b"T"
+                    and len(payload) == 2
+                    and payload[1] < len(engine.DIRECTIONS)
+                ):
+                    arena.game.snake.turn(engine.DIRECTIONS[payload[1]])
+                elif kind == b"R" and not arena.game.snake.alive:
+                    arena.restart(self.clock())
+                    self.wheel.schedule(arena.next_due, arena)
+                    self._send(arena, arena.snapshot())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            # A malformed message (ReplayError is a ValueError) only costs
+            # the client that sent it its connection
+            peer = writer.get_extra_info("peername")
+            print(f"Warning: dropping client {peer}: bad message ({e})")
+        finally:
+            if arena is not None:
+                self._leave(arena, writer)
+            writer.close()
+
+
+# --- Loopback Client ---
+class LoopbackClient:
+    """
+    Joins an arena, keeps a mirror of it from the snapshot and deltas, and
+    turns at random now and then. Used to test and load the server.
+    """
+
+    def __init__(self, rng, turn_chance=0.2, restart=True):
+        self.rng = rng
+        self.turn_chance = turn_chance
+        self.restart = restart
+        self.arena_id = None
+        self.ticks = 0
+        self.frames = 0
+        self.bytes_in = 0
+        self.deaths = 0
+
+    async def run(self, host, port, seed=None):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        join = bytearray(b"J")
+        write_varint(join, 0)
+        write_varint(join, 0 if seed is None else seed + 1)
+        self.writer.write(frame(bytes(join)))
+        try:
+            while True:
+                payload = await read_frame(self.reader)
+                self.frames += 1
+                self.bytes_in += len(payload) + 2
+                if payload[:1] == b"S":
+                    self._apply_snapshot(payload)
+                elif payload[:1] == b"D":
+                    self._apply_delta(payload)
+                    self._act()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.writer.close()
+
+    def _act(self):
+        if not self.alive:
+            self.deaths += 1
+            if self.restart:
+                self.writer.write(frame(b"R"))
+        elif self.rng.random() < self.turn_chance:
+            self.writer.write(frame(b"T" + bytes([self.rng.randrange(4)])))
+
+    def _apply_snapshot(self, data):
+        values, pos = read_varints(data, 1, 8)
+        self.arena_id, self.ticks, self.width, self.height = values[:4]
+        self.score = values[4]
+        self.alive = bool(values[5])
+        self.wrap = bool(values[6])
+        body, pos = read_varints(data, pos, values[7])
+        self.body = deque(body)
+        self.items, pos = read_varints(data, pos, len(ITEMS))
+        count, pos = read_varint(data, pos)
+        bombs, pos = read_varints(data, pos, count)
+        count, pos = read_varint(data, pos)
+        rocks, pos = read_varints(data, pos, count)
+        self.bombs, self.rocks = set(bombs), set(rocks)
+
+    def _apply_delta(self, data):
+        flags = data[1]
+        pos = 2
+        self.ticks += 1
+        if flags & FLAG_MOVED:
+            (head, drop), pos = read_varints(data, pos, 2)
+            self.body.appendleft(head)
+            for _ in range(drop):
+                self.body.pop()
+        if flags & FLAG_ITEMS:
+            mask = data[pos]
+            pos += 1
+            for i in range(len(ITEMS)):
+                if mask & (1 << i):
+                    self.items[i], pos = read_varint(data, pos)
+        if flags & FLAG_STATIC:
+            for cells, add in (
+                (self.bombs, True),
+                (self.bombs, False),
+                (self.rocks, True),
+                (self.rocks, False),
+            ):
+                count, pos = read_varint(data, pos)
+                changed, pos = read_varints(data, pos, count)
+                if add:
+                    cells.update(changed)
+                else:
+                    cells.difference_update(changed)
+        if flags & FLAG_SCORE:
+            self.score, pos = read_varint(data, pos)
+        self.alive = not flags & FLAG_DIED
+        self.wrap = bool(flags & FLAG_WRAP)
+
+    def matches(self, arena):
+        """Whether the mirror agrees with the server's arena."""
+        game = arena.game
+        bombs, rocks = arena._static()
+        return (
+            list(self.body) == list(game.snake.body)
+            and self.items == arena._items()
+            and self.bombs == bombs
+            and self.rocks == rocks
+            and self.score == game.score
+            and self.alive == game.snake.alive
+        )
+
+
+async def loadtest(arenas, seconds, seed=0):
+    server = ArenaServer(report_seconds=0)
+    port = await server.start_serving(port=0)
+    rng = random.Random(seed)
+    clients = [
+        LoopbackClient(random.Random(rng.getrandbits(32))) for _ in range(arenas)
+    ]
+    tasks = [asyncio.create_task(c.run("127.0.0.1", port)) for c in clients]
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        await asyncio.sleep(
+            min(REPORT_SECONDS, seconds - (time.perf_counter() - started))
+        )
+        print(server.report())
+    elapsed = time.perf_counter() - started
+    # Stop ticking, let the clients read what is in flight, then compare
+    await server.stop()
+    await asyncio.sleep(0.5)
+    in_sync = sum(
+        c.arena_id in server.arenas and c.matches(server.arenas[c.arena_id])
+        for c in clients
+    )
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    frames = sum(c.frames for c in clients)
+    received = sum(c.bytes_in for c in clients)
+    print(
+        f"{arenas} arenas for {elapsed:.1f}s: {server.ticks / elapsed:,.0f} ticks/sec, "
+        f"{received / max(frames, 1):.1f} bytes per frame, "
+        f"{sum(c.deaths for c in clients)} deaths"
+    )
+    print(f"{in_sync}/{arenas} client mirrors match the server")
+    return in_sync == arenas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snake arena server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load = sub.add_parser(
+        "loadtest", help="server plus loopback clients in one process"
+    )
+    load.add_argument("--arenas", type=int, default=300)
+    load.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+
+        async def serve_forever():
+            server = ArenaServer()
+            port = await server.start_serving(args.host, args.port)
+            print(f"Serving arenas on {args.host}:{port}")
+            await server.server.serve_forever()
+
+        asyncio.run(serve_forever())
+    else:
+        ok = asyncio.run(loadtest(args.arenas, args.seconds))
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Frame timing for the main loop.
+
+main() calls begin_frame() at the top of every frame and lap(name) after
+each phase or sub-step; a lap is the time since the previous one. With
+timing off both return straight away, so the calls can stay in the loop
+for good. Turned on, the profiler keeps the last `window` samples of
+every lap for rolling percentiles, counts frames that overran the frame
+budget, can draw a summary overlay, and can record a trace in the Chrome
+trace event format (open it in chrome://tracing or ui.perfetto.dev).
+
+It also measures steering latency: note_input() when a turn is taken,
+input_applied() when a logic tick moves the snake with it and
+frame_presented() once that move is on screen. The time from the first
+to the last is kept under "input". Keys are timed from when the frame
+picks them up, so the wait for that frame is not included.
+"""
+
+import json
+import time
+from collections import deque
+
+import pygame
+
+# How often the overlay text is re-rendered, in seconds
+OVERLAY_REFRESH = 0.25
+# A frame taking this many times the budget counts as dropped
+DROPPED_FACTOR = 1.5
+# Traces stop growing past this many laps
+MAX_TRACE_EVENTS = 1_000_000
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    def __init__(self, target_fps, window=240):
+        self.frame_budget = 1000.0 / target_fps
+        self.window = window
+        self.enabled = False
+        self.show_overlay = False
+        self.tracing = False
+        self.samples = {}
+        self.frame_times = deque(maxlen=window)
+        self.frames = 0
+        self.dropped = 0
+        self.frame_start = None
+        self.last = 0.0
+        self.inputs = deque()
+        self.applied = []
+        self.input_latency = deque(maxlen=window)
+        self.trace = []
+        self.overlay = None
+        self.overlay_time = 0.0
+
+    def _update_enabled(self):
+        enabled = self.show_overlay or self.tracing
+        if enabled and not self.enabled:
+            # Don't count the time spent switched off as one long frame,
+            # nor match moves to turns that were never noted
+            self.frame_start = None
+            self.clear_inputs()
+        self.enabled = enabled
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self.overlay = None
+        self._update_enabled()
+
+    # --- Timing ---
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            frame_ms = (now - self.frame_start) * 1000
+            self.frame_times.append(frame_ms)
+            self.frames += 1
+            if frame_ms > self.frame_budget * DROPPED_FACTOR:
+                self.dropped += 1
+        self.frame_start = self.last = now
+
+    def reset_frame(self):
+        """Don't count the time since the last frame (e.g. spent asleep)."""
+        self.frame_start = None
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        buf = self.samples.get(name)
+        if buf is None:
+            buf = self.samples[name] = deque(maxlen=self.window)
+        buf.append((now - self.last) * 1000)
+        if self.tracing and len(self.trace) < MAX_TRACE_EVENTS:
+            self.trace.append((name, self.last, now))
+        self.last = now
+
+    # --- Input latency ---
+    def note_input(self):
+        if self.enabled:
+            self.inputs.append(time.perf_counter())
+
+    def input_applied(self):
+        """A tick moved the snake with the oldest noted turn."""
+        if self.inputs:
+            self.applied.append(self.inputs.popleft())
+
+    def frame_presented(self):
+        if not self.applied:
+            return
+        now = time.perf_counter()
+        for noted in self.applied:
+            self.input_latency.append((now - noted) * 1000)
+        self.applied.clear()
+
+    def clear_inputs(self):
+        """Forgets turns that will never be applied (e.g. on a new run)."""
+        self.inputs.clear()
+        self.applied.clear()
+
+    def summary(self):
+        """{name: (p50, p99)} in ms, with the whole frame under "frame"."""
+        stats = {}
+        frames = sorted(self.frame_times)
+        stats["frame"] = (percentile(frames, 50), percentile(frames, 99))
+        for name, buf in self.samples.items():
+            values = sorted(buf)
+            stats[name] = (percentile(values, 50), percentile(values, 99))
+        if self.input_latency:
+            values = sorted(self.input_latency)
+            stats["input"] = (percentile(values, 50), percentile(values, 99))
+        return stats
+
+    # --- Overlay ---
+    def draw_overlay(self, surface, font):
+        """Blits the summary in the top-right corner and returns its Rect."""
+        if not self.show_overlay:
+            return None
+        now = time.perf_counter()
+        if self.overlay is None or now - self.overlay_time >= OVERLAY_REFRESH:
+            self.overlay = self._render_overlay(font)
+            self.overlay_time = now
+        x = surface.get_width() - self.overlay.get_width() - 10
+        return surface.blit(self.overlay, (x, 10))
+
+    def _render_overlay(self, font):
+        stats = self.summary()
+        p50, p99 = stats.pop("frame")
+        lines = [
+            f"frame  p50 {p50:5.2f}  p99 {p99:5.2f} ms",
+            f"dropped {self.dropped} of {self.frames}",
+        ]
+        lines += [
+            f"{name:13} {p50:5.2f} {p99:6.2f}" for name, (p50, p99) in stats.items()
+        ]
+        if self.tracing:
+            lines.append(f"tracing ({len(self.trace)} laps)")
+        rendered = [font.render(line, True, (255, 255, 255)) for line in lines]
+        line_h = font.get_linesize()
+        width = max(r.get_width() for r in rendered) + 12
+        panel = pygame.Surface((width, line_h * len(rendered) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for i, r in enumerate(rendered):
+            panel.blit(r, (6, 4 + i * line_h))
+        return panel
+
+    # --- Traces ---
+    def start_trace(self):
+        self.trace = []
+        self.tracing = True
+        self._update_enabled()
+
+    def stop_trace(self, path):
+        """Writes the recorded laps to path as Chrome trace events."""
+        self.tracing = False
+        self._update_enabled()
+        trace, self.trace = self.trace, []
+        if not trace:
+            return
+        origin = trace[0][1]
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": 1,
+                "tid": 1,
+            }
+            for name, start, end in trace
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,341 @@
+from collections import OrderedDict
+
+import pygame
+
+
+# --- Presentation Helpers ---
+def letterbox(window_size, virtual_size):
+    """
+    Aspect-ratio fit of the virtual surface inside the window.
+    Returns (scale, offset_x, offset_y, new_w, new_h).
+    """
+    real_w, real_h = window_size
+    virtual_w, virtual_h = virtual_size
+    scale = min(real_w / virtual_w, real_h / virtual_h)
+    new_w = int(virtual_w * scale)
+    new_h = int(virtual_h * scale)
+    offset_x = (real_w - new_w) // 2
+    offset_y = (real_h - new_h) // 2
+    return scale, offset_x, offset_y, new_w, new_h
+
+
+class SoftwarePresenter:
+    """
+    The original path: draw on an off-screen virtual surface, then scale
+    it into the resizable window with pygame.transform.scale.
+    """
+
+    def __init__(self, virtual_size, letterbox_color):
+        self.virtual_size = virtual_size
+        self.letterbox_color = letterbox_color
+        self.screen = pygame.display.set_mode(virtual_size, pygame.RESIZABLE)
+        self.game_surface = pygame.Surface(virtual_size)
+        # A profiler.FrameProfiler, if the scale and flip should be timed
+        self.profiler = None
+
+    def to_virtual(self, pos):
+        """Window coordinates to coordinates on the virtual surface."""
+        scale, offset_x, offset_y, _, _ = letterbox(
+            self.screen.get_size(), self.virtual_size
+        )
+        return int((pos[0] - offset_x) / scale), int((pos[1] - offset_y) / scale)
+
+    def toggle_fullscreen(self):
+        if pygame.display.is_fullscreen():
+            self.screen = pygame.display.set_mode(self.virtual_size, pygame.RESIZABLE)
+        else:
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+
+    def present(self):
+        """Scales the whole virtual surface into the window and flips."""
+        screen = self.screen
+        screen.fill(self.letterbox_color)  # Fill black bars
+        _, offset_x, offset_y, new_w, new_h = letterbox(
+            screen.get_size(), self.virtual_size
+        )
+        scaled_surf = pygame.transform.scale(self.game_surface, (new_w, new_h))
+        screen.blit(scaled_surf, (offset_x, offset_y))
+        if self.profiler:
+            self.profiler.lap("scale")
+        pygame.display.flip()
+        if self.profiler:
+            self.profiler.lap("flip")
+
+    def present_rects(self, rects):
+        """Scales and pushes only the given virtual-surface rects."""
+        scale, offset_x, offset_y, _, _ = letterbox(
+            self.screen.get_size(), self.virtual_size
+        )
+        updated = []
+        for rect in rects:
+            # Shared edges round the same way, so neighbouring rects meet
+            sx = offset_x + int(rect.x * scale)
+            sy = offset_y + int(rect.y * scale)
+            sw = offset_x + int(rect.right * scale) - sx
+            sh = offset_y + int(rect.bottom * scale) - sy
+            if sw <= 0 or sh <= 0:
+                continue
+            part = self.game_surface.subsurface(rect)
+            if scale != 1.0:
+                part = pygame.transform.scale(part, (sw, sh))
+            self.screen.blit(part, (sx, sy))
+            updated.append(pygame.Rect(sx, sy, sw, sh))
+        if self.profiler:
+            self.profiler.lap("scale")
+        pygame.display.update(updated)
+        if self.profiler:
+            self.profiler.lap("flip")
+
+
+class ScaledPresenter:
+    """
+    Lets SDL do the letterboxed scaling (pygame.SCALED).
+
+    The display surface is the virtual surface, so the game draws straight
+    into it; SDL uploads it to a texture and its renderer stretches that
+    into the window. The software renderer works too
+    (SDL_RENDER_DRIVER=software). SDL also maps mouse positions back to
+    virtual coordinates, so to_virtual() has nothing to do.
+    """
+
+    def __init__(self, virtual_size, letterbox_color):
+        self.virtual_size = virtual_size
+        self.game_surface = pygame.display.set_mode(
+            virtual_size, pygame.SCALED | pygame.RESIZABLE
+        )
+        self.screen = self.game_surface
+        self.profiler = None
+
+    def to_virtual(self, pos):
+        return int(pos[0]), int(pos[1])
+
+    def toggle_fullscreen(self):
+        try:
+            pygame.display.toggle_fullscreen()
+        except pygame.error as e:
+            print(f"Warning: fullscreen toggle unavailable ({e})")
+
+    def present(self):
+        pygame.display.flip()
+        if self.profiler:
+            self.profiler.lap("flip")
+
+    def present_rects(self, rects):
+        pygame.display.update(rects)
+        if self.profiler:
+            self.profiler.lap("flip")
+
+
+PRESENTERS = {
+    "software": SoftwarePresenter,
+    "scaled": ScaledPresenter,
+}
+
+
+# --- Camera ---
+class Camera:
+    """
+    A view-sized window onto a board bigger than the screen.
+
+    x and y are the board pixel shown at the top-left of the view. The
+    camera centres on its target but stops at the board edges, and
+    centres the whole board if it is smaller than the view.
+    """
+
+    def __init__(self, view_w, view_h, board_w, board_h, cell):
+        self.view_w = view_w
+        self.view_h = view_h
+        self.board_w = board_w
+        self.board_h = board_h
+        self.cell = cell
+        self.x = 0
+        self.y = 0
+
+    def follow(self, target_x, target_y):
+        world_w = self.board_w * self.cell
+        world_h = self.board_h * self.cell
+        if world_w <= self.view_w:
+            self.x = (world_w - self.view_w) // 2
+        else:
+            self.x = int(min(max(target_x - self.view_w / 2, 0), world_w - self.view_w))
+        if world_h <= self.view_h:
+            self.y = (world_h - self.view_h) // 2
+        else:
+            self.y = int(min(max(target_y - self.view_h / 2, 0), world_h - self.view_h))
+
+    def visible_cells(self, margin=1):
+        """(x0, y0, x1, y1) cell range on screen, end exclusive, plus a margin."""
+        cell = self.cell
+        x0 = max(self.x // cell - margin, 0)
+        y0 = max(self.y // cell - margin, 0)
+        x1 = min((self.x + self.view_w) // cell + 1 + margin, self.board_w)
+        y1 = min((self.y + self.view_h) // cell + 1 + margin, self.board_h)
+        return x0, y0, x1, y1
+
+    def sees_cell(self, x, y, margin=1):
+        x0, y0, x1, y1 = self.visible_cells(margin)
+        return x0 <= x < x1 and y0 <= y < y1
+
+
+def draw_tiled(surface, image, offset_x, offset_y):
+    """Covers surface with image repeated, scrolled by the given offset."""
+    tile_w, tile_h = image.get_size()
+    view_w, view_h = surface.get_size()
+    y = -(offset_y % tile_h)
+    while y < view_h:
+        x = -(offset_x % tile_w)
+        while x < view_w:
+            surface.blit(image, (x, y))
+            x += tile_w
+        y += tile_h
+
+
+# --- Dirty Rectangle Renderer ---
+class DirtyRenderer:
+    """
+    Redraws and pushes only the parts of the frame that changed.
+
+    The virtual surface is split into tiles. Everything drawn in a frame
+    is reported through mark(); at the start of the next frame those tiles
+    are restored from the cached background, and present() scales only the
+    tiles touched in either frame and hands them to display.update().
+    Anything not part of the background must be redrawn (and marked)
+    every frame for this to stay correct.
+    """
+
+    def __init__(self, width, height, tile):
+        self.width = width
+        self.height = height
+        self.tile = tile
+        self.cols = -(-width // tile)
+        self.rows = -(-height // tile)
+        self.background = None
+        self.tiles = set()
+        self.prev_tiles = set()
+        self.full = True
+
+    def invalidate(self):
+        """The next frame is restored and pushed in full."""
+        self.full = True
+        self.tiles.clear()
+        self.prev_tiles.clear()
+
+    def set_background(self, surface):
+        if surface is not self.background:
+            self.background = surface
+            self.full = True
+
+    def mark(self, rect):
+        if rect is None:
+            return
+        tile = self.tile
+        left = max(rect[0], 0)
+        top = max(rect[1], 0)
+        right = min(rect[0] + rect[2], self.width)
+        bottom = min(rect[1] + rect[3], self.height)
+        if right <= left or bottom <= top:
+            return
+        cols = self.cols
+        tiles = self.tiles
+        for ty in range(top // tile, (bottom - 1) // tile + 1):
+            row = ty * cols
+            for tx in range(left // tile, (right - 1) // tile + 1):
+                tiles.add(row + tx)
+
+    def mark_all(self, rects):
+        for rect in rects:
+            self.mark(rect)
+
+    def _runs(self, tiles):
+        # Merges dirty tiles into horizontal runs, one Rect per run
+        cols = self.cols
+        runs = []
+        start = None
+        prev = None
+        for t in sorted(tiles):
+            if start is not None and t == prev + 1 and t % cols != 0:
+                prev = t
+                continue
+            if start is not None:
+                runs.append(self._run_rect(start, prev))
+            start = prev = t
+        if start is not None:
+            runs.append(self._run_rect(start, prev))
+        return runs
+
+    def _run_rect(self, first, last):
+        tile = self.tile
+        x = (first % self.cols) * tile
+        y = (first // self.cols) * tile
+        w = min((last % self.cols + 1) * tile, self.width) - x
+        h = min(y + tile, self.height) - y
+        return pygame.Rect(x, y, w, h)
+
+    def restore(self, surface):
+        """Paints the background back over everything drawn last frame."""
+        if self.full:
+            surface.blit(self.background, (0, 0))
+            return
+        for run in self._runs(self.prev_tiles):
+            surface.blit(self.background, run, run)
+
+    def present(self, presenter):
+        if self.full:
+            presenter.present()
+            self.full = False
+        else:
+            presenter.present_rects(self._runs(self.tiles | self.prev_tiles))
+        self.prev_tiles = self.tiles
+        self.tiles = set()
+
+
+# --- Fonts and Text ---
+class FontRegistry:
+    """One shared Font per (name, size, bold, italic); SysFont lookups are slow."""
+
+    def __init__(self):
+        self.fonts = {}
+
+    def get(self, name, size, bold=False, italic=False):
+        key = (name, size, bold, italic)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, size, bold=bold, italic=italic)
+            self.fonts[key] = font
+        return font
+
+
+class TextCache:
+    """
+    Least-recently-used cache of rendered text keyed by (font, text, color).
+
+    Labels that never change are rasterized once. Numbers go through
+    blit_number(), which draws them from cached per-character glyphs so
+    a changing score never has to be rendered as a whole string.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.entries.get(key)
+        if surf is None:
+            surf = font.render(text, True, color)
+            self.entries[key] = surf
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return surf
+
+    def blit_number(self, surface, font, prefix, value, color, pos):
+        """Blits prefix followed by value, glyph by glyph. Returns the Rect."""
+        x, y = pos
+        area = surface.blit(self.render(font, prefix, color), (x, y))
+        x = area.right
+        for ch in str(value):
+            x = surface.blit(self.render(font, ch, color), (x, y)).right
+        area.width = x - area.x
+        return area
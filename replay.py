@@ -0,0 +1,184 @@
+"""
+Deterministic replays: the seed of a run plus the ticks where its input
+changed, in a compact binary log.
+
+Layout (every integer is an unsigned LEB128 varint):
+
+    b"SNKR" version seed width height record* end
+
+Each record is one varint, (tick_delta << 3) | code, where tick_delta is
+the number of ticks stepped since the previous record:
+
+    0-3   turn UP / DOWN / LEFT / RIGHT on the next tick
+    4     CLOCK: a varint follows, the logic clock in ms since the run
+          started (pause/resume and dropped backlogs move the clock)
+    5     END: a varint follows, the final score, checked on playback
+
+Usage: python replay.py RUN.snkr [RUN.snkr ...]
+"""
+
+import sys
+import time
+
+import engine
+
+MAGIC = b"SNKR"
+VERSION = 1
+
+CODE_CLOCK = 4
+CODE_END = 5
+
+
+class ReplayError(ValueError):
+    """The data is not a replay, or playing it back went a different way."""
+
+
+# --- Varints ---
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """Returns (value, next position)."""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("replay is truncated")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+# --- Recording ---
+class Recorder:
+    """
+    Watches one run. Call before_step() right before every game.step()
+    and finish() once the run is over.
+    """
+
+    def __init__(self, game, seed):
+        self.start = game.last_move_time
+        self.out = bytearray(MAGIC)
+        self.out.append(VERSION)
+        for value in (seed, game.board.width, game.board.height):
+            write_varint(self.out, value)
+        self.ticks = 0
+        self.last_tick = 0
+        self.expected_clock = game.last_move_time
+
+    def _record(self, code):
+        write_varint(self.out, ((self.ticks - self.last_tick) << 3) | code)
+        self.last_tick = self.ticks
+
+    def before_step(self, game):
+        if game.last_move_time != self.expected_clock:
+            self._record(CODE_CLOCK)
+            write_varint(self.out, int(game.last_move_time - self.start))
+        snake = game.snake
+        if snake.new_direction != snake.direction:
+            self._record(engine.DIRECTION_CODES[snake.new_direction])
+        self.expected_clock = game.last_move_time + game.move_delay
+        self.ticks += 1
+
+    def finish(self, game):
+        """Closes the log and returns it as bytes."""
+        self._record(CODE_END)
+        write_varint(self.out, game.score)
+        return bytes(self.out)
+
+
+# --- Playback ---
+class Replay:
+    def __init__(self, seed, width, height, records):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        # (tick_delta, code, value) with value None for turns
+        self.records = records
+
+    @classmethod
+    def parse(cls, data):
+        if data[:4] != MAGIC:
+            raise ReplayError("not a replay file")
+        if data[4] != VERSION:
+            raise ReplayError(f"unsupported replay version {data[4]}")
+        pos = 5
+        seed, pos = read_varint(data, pos)
+        width, pos = read_varint(data, pos)
+        height, pos = read_varint(data, pos)
+        records = []
+        while pos < len(data):
+            word, pos = read_varint(data, pos)
+            code = word & 7
+            value = None
+            if code in (CODE_CLOCK, CODE_END):
+                value, pos = read_varint(data, pos)
+            elif code > CODE_END:
+                raise ReplayError(f"unknown record code {code}")
+            records.append((word >> 3, code, value))
+        if not records or records[-1][1] != CODE_END:
+            raise ReplayError("replay has no end record")
+        return cls(seed, width, height, records)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.parse(f.read())
+
+    def play(self, game=None):
+        """
+        Re-runs the recording as fast as the engine goes and returns the
+        final GameState. Pass a game to replay into it (e.g. the pygame
+        subclass); it is reset with the recorded seed first.
+        """
+        if game is None:
+            game = engine.GameState(width=self.width, height=self.height)
+        game.reset(0, seed=self.seed)
+        action = None
+        for delta, code, value in self.records:
+            for _ in range(delta):
+                game.step(action)
+                action = None
+            if code == CODE_CLOCK:
+                game.last_move_time = value
+            elif code == CODE_END:
+                if game.score != value:
+                    raise ReplayError(
+                        f"playback scored {game.score}, recording says {value}"
+                    )
+            else:
+                action = engine.DIRECTIONS[code]
+        return game
+
+
+def main(paths):
+    for path in paths:
+        try:
+            replay = Replay.load(path)
+            started = time.perf_counter()
+            game = replay.play()
+            elapsed = time.perf_counter() - started
+        except (OSError, ReplayError) as e:
+            print(f"{path}: {e}")
+            continue
+        ticks = sum(delta for delta, _, _ in replay.records)
+        rate = ticks / elapsed if elapsed > 0 else float("inf")
+        status = "alive" if game.snake.alive else "dead"
+        print(
+            f"{path}: seed {replay.seed}, {ticks} ticks, score {game.score} "
+            f"({status}), {rate:,.0f} ticks/sec"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+    main(sys.argv[1:])
@@ -0,0 +1,236 @@
+"""
+Gymnasium-style environment over the engine rules, for training agents.
+
+reset() returns (observation, info) and step(action) returns
+(observation, reward, terminated, truncated, info). Actions are 0-3 for
+up, down, left and right (engine.DIRECTIONS). The reward is the score
+gained on the step (apple 10, banana 20, cookie 50). Bombs shrink the
+snake by 4 and end the run if it is too short; rocks, walls and the body
+end it. The star makes the edges wrap for a while.
+
+The observation is one preallocated uint8 array of shape
+(len(CHANNELS), height, width), with a 1 wherever the channel's thing is.
+It is not rebuilt from the snake and the item lists each step. A step
+only writes the cells that changed: the new head, the tail it left and
+any item that moved. The whole array is redrawn only when bombs or rocks
+change, which is rare. The same array is returned every time, and
+`channels` holds a view of each plane, so copy it to keep a frame.
+
+With render_mode="rgb_array" the game is drawn by the pygame front end
+onto a surface that wraps a NumPy buffer, and render() returns an
+(height, width, 3) view of it. Nothing is copied, and the surface is
+never locked, which a surfarray.pixels3d view would do until it was let
+go of.
+
+gymnasium is optional: with it installed SnakeEnv is a gymnasium.Env
+with the matching spaces; without it the same methods work on their own.
+
+Usage: python snake_env.py [steps]   measures steps/sec with random
+actions.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import engine
+
+try:
+    import gymnasium
+    from gymnasium import spaces
+except ImportError:
+    gymnasium = None
+
+CHANNELS = ("body", "head", "apple", "cookie", "banana", "star", "bomb", "rock")
+ITEM_CHANNELS = (2, 3, 4, 5)
+
+
+class SnakeEnv(gymnasium.Env if gymnasium else object):
+    metadata = {"render_modes": ["rgb_array"], "render_fps": 60}
+
+    def __init__(
+        self,
+        width=engine.GRID_WIDTH,
+        height=engine.GRID_HEIGHT,
+        max_steps=None,
+        render_mode=None,
+    ):
+        if render_mode not in (None, "rgb_array"):
+            raise ValueError(f"unsupported render_mode {render_mode!r}")
+        self.render_mode = render_mode
+        self.width = width
+        self.height = height
+        self.max_steps = max_steps
+        self.front_end = None
+        if render_mode == "rgb_array":
+            self._init_render()
+            self.game = self.front_end.Game(width=width, height=height)
+        else:
+            self.game = engine.GameState(width=width, height=height)
+
+        self.obs = np.zeros((len(CHANNELS), height, width), dtype=np.uint8)
+        self.channels = {name: self.obs[i] for i, name in enumerate(CHANNELS)}
+        # One flat row per channel, indexed by packed cell, for the
+        # per-step writes
+        self._planes = self.obs.reshape(len(CHANNELS), width * height)
+        self._head = -1
+        self._item_cells = [-1] * len(ITEM_CHANNELS)
+        self._static_version = -1
+        self.steps = 0
+        self.info = {}
+
+        if gymnasium:
+            self.observation_space = spaces.Box(0, 1, self.obs.shape, dtype=np.uint8)
+            self.action_space = spaces.Discrete(len(engine.DIRECTIONS))
+
+    # --- Observation ---
+    def _items(self):
+        game = self.game
+        return (game.apple, game.cookie, game.banana, game.star)
+
+    def _redraw(self):
+        """Rebuilds every channel from the game."""
+        game = self.game
+        w = self.width
+        planes = self._planes
+        self.obs.fill(0)
+        planes[0, list(game.snake.body)] = 1
+        self._head = game.snake.body[0]
+        planes[1, self._head] = 1
+        for i, item in enumerate(self._items()):
+            cell = -1
+            if item.active:
+                x, y = item.position
+                cell = y * w + x
+                planes[ITEM_CHANNELS[i], cell] = 1
+            self._item_cells[i] = cell
+        bombs = planes[6]
+        for x, y in game.bombs:
+            bombs[y * w + x] = 1
+        rocks = planes[7]
+        for rock in game.rocks:
+            for x, y in rock.footprint:
+                rocks[y * w + x] = 1
+        self._static_version = game.static_version
+
+    def _update(self, length_before):
+        """Writes only the cells the last step changed."""
+        game = self.game
+        snake = game.snake
+        if game.static_version != self._static_version:
+            # Bombs or rocks came or went, or a bomb shrank the snake
+            self._redraw()
+            return
+        w = self.width
+        planes = self._planes
+        if snake.moved:
+            head = snake.body[0]
+            planes[0, head] = 1
+            planes[1, self._head] = 0
+            planes[1, head] = 1
+            self._head = head
+            if len(snake.body) == length_before:
+                planes[0, snake.prev_tail] = 0
+        cells = self._item_cells
+        for i, item in enumerate(self._items()):
+            cell = -1
+            if item.active:
+                x, y = item.position
+                cell = y * w + x
+            if cell != cells[i]:
+                plane = planes[ITEM_CHANNELS[i]]
+                if cells[i] >= 0:
+                    plane[cells[i]] = 0
+                if cell >= 0:
+                    plane[cell] = 1
+                cells[i] = cell
+
+    def _update_info(self):
+        # Updated in place, like the observation
+        game = self.game
+        info = self.info
+        info["score"] = game.score
+        info["length"] = len(game.snake.body)
+        info["wrap"] = game.snake.wrap_mode
+        info["steps"] = self.steps
+        return info
+
+    # --- Gym API ---
+    def reset(self, seed=None, options=None):
+        """Starts a run; a seed reproduces it, as in replay.py."""
+        if gymnasium:
+            super().reset(seed=seed)
+        self.game.reset(0, seed=seed)
+        self.steps = 0
+        self._redraw()
+        return self.obs, self._update_info()
+
+    def step(self, action):
+        game = self.game
+        score = game.score
+        length = len(game.snake.body)
+        game.step(engine.DIRECTIONS[action])
+        self.steps += 1
+        self._update(length)
+        terminated = not game.snake.alive
+        truncated = self.max_steps is not None and self.steps >= self.max_steps
+        return (
+            self.obs,
+            float(game.score - score),
+            terminated,
+            truncated,
+            self._update_info(),
+        )
+
+    # --- Rendering ---
+    def _init_render(self):
+        import pygame
+
+        import main as front_end
+
+        front_end.init()
+        self.front_end = front_end
+        # The pixels live in rgb; the surface draws straight into them
+        self.rgb = np.zeros(
+            (front_end.VIRTUAL_HEIGHT, front_end.VIRTUAL_WIDTH, 4), np.uint8
+        )
+        self.surface = pygame.image.frombuffer(
+            self.rgb, (front_end.VIRTUAL_WIDTH, front_end.VIRTUAL_HEIGHT), "RGBX"
+        )
+        self.camera = front_end.render.Camera(
+            front_end.VIRTUAL_WIDTH,
+            front_end.VIRTUAL_HEIGHT,
+            self.width,
+            self.height,
+            front_end.GRID_SIZE,
+        )
+
+    def render(self):
+        """The game as an (height, width, 3) uint8 view, or None."""
+        if self.front_end is None:
+            return None
+        fe = self.front_end
+        fe.draw_world_view(self.surface, self.game, 1.0, self.camera, fe.bg_image)
+        return self.rgb[:, :, :3]
+
+    def close(self):
+        self.front_end = None
+
+
+def benchmark(steps, seed=0):
+    env = SnakeEnv()
+    rng = np.random.default_rng(seed)
+    actions = rng.integers(0, 4, steps).tolist()
+    env.reset(seed=seed)
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"SnakeEnv: {benchmark(steps):,.0f} steps/sec")
@@ -0,0 +1,385 @@
+"""
+Snapshots: the whole state of a GameState in a compact binary blob, for
+rollback (netcode, bots that try moves and take them back) and for
+resuming a run after a restart.
+
+save() and restore() copy arrays wholesale instead of replaying a run,
+so both take microseconds. A restored game carries on exactly as the
+saved one would have, down to the rng and the order of the board's free
+lists, which decide where the next item spawns.
+
+Layout (little-endian):
+
+    HEADER                 magic, version, board size, clock, score,
+                           snake heading and flags, item cells, counts
+    queued turns           one byte each, coded as in replay.py
+    body                   cells, head first
+    bombs, rocks           cells (a rock's is its top-left corner)
+    rng                    the Mersenne Twister state, 625 x u32
+    board                  occupancy counts (one byte per cell), then
+                           the free cell and free 2x2 corner lists and
+                           their index maps
+
+Cells are packed as y * width + x in 16 bits, or 32 on boards of more
+than 32767 cells. A default board takes about 7 KB, most of it the rng
+and the free lists.
+
+static_version is not restored but bumped, so anything that cached the
+scenery of the old state draws it again.
+
+Usage: python snapshot.py [games]   plays seeded games, checks that
+restored snapshots play out the same, and times save and restore.
+"""
+
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+
+import autopilot
+import engine
+
+MAGIC = b"SNKS"
+VERSION = 1
+
+HEADER = struct.Struct(
+    "<4sBHH"  # magic, version, width, height
+    "dddd"  # now, last_move_time, move_delay, star_end_time
+    "qIqq"  # score, apples_eaten_count, rock_milestone, head_stamp
+    "BBBB"  # direction, new_direction, flags, queued turns
+    "iIII"  # prev_tail, body, bombs, rocks
+    "iiii"  # apple, cookie, banana, star (-1 when inactive)
+    "dII"  # gauss_next, free cells, free corners
+)
+
+FLAG_GROW = 1
+FLAG_ALIVE = 2
+FLAG_WRAP = 4
+FLAG_MOVED = 8
+FLAG_GAUSS = 16
+
+# The Mersenne Twister state: 624 words and a position
+RNG = struct.Struct("<625I")
+ITEMS = ("apple", "cookie", "banana", "star")
+# Self-check games stop after this many ticks
+CHECK_TICKS = 5_000
+
+
+class SnapshotError(ValueError):
+    """The data is not a snapshot, or was taken on a different board."""
+
+
+def _pack(typecode, values):
+    return array(typecode, values).tobytes()
+
+
+def _unpack(typecode, data, pos, count):
+    values = array(typecode)
+    end = pos + count * values.itemsize
+    values.frombytes(data[pos:end])
+    return values, end
+
+
+# --- Saving ---
+def save(game):
+    """Returns a snapshot of game as bytes."""
+    board = game.board
+    snake = game.snake
+    w = board.width
+    ctype = board.free.typecode
+
+    flags = (
+        (FLAG_GROW if snake.grow else 0)
+        | (FLAG_ALIVE if snake.alive else 0)
+        | (FLAG_WRAP if snake.wrap_mode else 0)
+        | (FLAG_MOVED if snake.moved else 0)
+    )
+    _, rng_words, gauss = game.rng.getstate()
+    if gauss is not None:
+        flags |= FLAG_GAUSS
+    items = [
+        (item.position[1] * w + item.position[0]) if item.active else -1
+        for item in (getattr(game, name) for name in ITEMS)
+    ]
+    rocks = [r.position[1] * w + r.position[0] for r in game.rocks if r.active]
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        w,
+        board.height,
+        game.now,
+        game.last_move_time,
+        game.move_delay,
+        game.star_end_time,
+        game.score,
+        game.apples_eaten_count,
+        game.rock_milestone,
+        snake.head_stamp,
+        engine.DIRECTION_CODES[snake.direction],
+        engine.DIRECTION_CODES[snake.new_direction],
+        flags,
+        len(snake.queued_turns),
+        snake.prev_tail,
+        len(snake.body),
+        len(game.bombs),
+        len(rocks),
+        *items,
+        gauss or 0.0,
+        len(board.free),
+        len(board.corners),
+    )
+    return b"".join(
+        (
+            header,
+            bytes(engine.DIRECTION_CODES[d] for d in snake.queued_turns),
+            _pack(ctype, snake.body),
+            _pack(ctype, [y * w + x for x, y in game.bombs]),
+            _pack(ctype, rocks),
+            RNG.pack(*rng_words),
+            # The board's own arrays are already in the snapshot's types
+            board.counts.tobytes(),
+            board.free.tobytes(),
+            board.free_index.tobytes(),
+            board.corners.tobytes(),
+            board.corner_index.tobytes(),
+        )
+    )
+
+
+# --- Restoring ---
+def restore(game, data, now=None):
+    """
+    Puts game back into the state data was saved from. The game must be
+    on a board of the same size. With now, the clock is moved so that the
+    saved moment becomes now, keeping the time left on the next move and
+    on the star (use it when resuming on a different clock).
+    """
+    if data[:4] != MAGIC:
+        raise SnapshotError("not a snapshot")
+    if len(data) < HEADER.size:
+        raise SnapshotError("snapshot is truncated")
+    (
+        _,
+        version,
+        w,
+        h,
+        saved_now,
+        last_move_time,
+        move_delay,
+        star_end_time,
+        score,
+        apples_eaten_count,
+        rock_milestone,
+        head_stamp,
+        direction,
+        new_direction,
+        flags,
+        queued,
+        prev_tail,
+        length,
+        bomb_count,
+        rock_count,
+        *items,
+        gauss,
+        free_count,
+        corner_count,
+    ) = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version}")
+    board = game.board
+    if (w, h) != (board.width, board.height):
+        raise SnapshotError(
+            f"snapshot is of a {w}x{h} board, not {board.width}x{board.height}"
+        )
+    cells = w * h
+    ctype = engine.cell_typecode(cells)
+    expected = (
+        HEADER.size
+        + queued
+        + (length + bomb_count + rock_count + free_count + corner_count + 2 * cells)
+        * array(ctype).itemsize
+        + RNG.size
+        + cells
+    )
+    if len(data) != expected:
+        raise SnapshotError("snapshot is truncated")
+
+    pos = HEADER.size
+    queued_codes = data[pos : pos + queued]
+    pos += queued
+    body, pos = _unpack(ctype, data, pos, length)
+    bomb_cells, pos = _unpack(ctype, data, pos, bomb_count)
+    rock_cells, pos = _unpack(ctype, data, pos, rock_count)
+    rng_words = RNG.unpack_from(data, pos)
+    pos += RNG.size
+    counts, pos = _unpack("B", data, pos, cells)
+    free, pos = _unpack(ctype, data, pos, free_count)
+    free_index, pos = _unpack(ctype, data, pos, cells)
+    corners, pos = _unpack(ctype, data, pos, corner_count)
+    corner_index, pos = _unpack(ctype, data, pos, cells)
+
+    # The board's occupancy and free lists come back as they were, so
+    # placing things below must not go through occupy()/vacate()
+    board.counts = counts
+    board.free = free
+    board.free_index = free_index
+    board.corners = corners
+    board.corner_index = corner_index
+    entities = board.entities = [None] * cells
+
+    for name, cell in zip(ITEMS, items):
+        item = getattr(game, name)
+        item.active = cell >= 0
+        if item.active:
+            item.position = (cell % w, cell // w)
+            entities[cell] = item
+        else:
+            item.position = (-1, -1)
+
+    pool = game.bomb_pool
+    for b in game.bombs.values():
+        b.active = False
+        pool.append(b)
+    game.bombs.clear()
+    for cell in bomb_cells:
+        b = pool.pop() if pool else game.item_cls("bomb", board)
+        b.position = (cell % w, cell // w)
+        b.active = True
+        game.bombs[b.position] = b
+        entities[cell] = b
+
+    rocks = game.rocks[:rock_count]
+    while len(rocks) < rock_count:
+        rocks.append(game.rock_cls(board))
+    for r, cell in zip(rocks, rock_cells):
+        x, y = cell % w, cell // w
+        r.position = (x, y)
+        r.footprint = [(x, y), (x + 1, y), (x, y + 1), (x + 1, y + 1)]
+        r.active = True
+        for fx, fy in r.footprint:
+            entities[fy * w + fx] = r
+    game.rocks = rocks
+
+    snake = game.snake
+    snake_counts = snake.cell_counts = array("i", [0]) * cells
+    stamps = snake.cell_stamps
+    stamp = head_stamp
+    for cell in body:
+        snake_counts[cell] += 1
+        stamps[cell] = stamp
+        stamp -= 1
+    snake.body = deque(body)
+    snake.head_stamp = head_stamp
+    snake.prev_tail = prev_tail
+    snake.direction = engine.DIRECTIONS[direction]
+    snake.new_direction = engine.DIRECTIONS[new_direction]
+    snake.queued_turns = deque(engine.DIRECTIONS[code] for code in queued_codes)
+    snake.grow = bool(flags & FLAG_GROW)
+    snake.alive = bool(flags & FLAG_ALIVE)
+    snake.wrap_mode = bool(flags & FLAG_WRAP)
+    snake.moved = bool(flags & FLAG_MOVED)
+
+    game.rng.setstate((3, rng_words, gauss if flags & FLAG_GAUSS else None))
+    shift = 0 if now is None else now - saved_now
+    game.now = saved_now + shift
+    game.last_move_time = last_move_time + shift
+    game.star_end_time = star_end_time + shift if star_end_time else 0
+    game.move_delay = move_delay
+    game.score = score
+    game.apples_eaten_count = apples_eaten_count
+    game.rock_milestone = rock_milestone
+    game.static_version += 1
+
+
+def save_file(game, path):
+    with open(path, "wb") as f:
+        f.write(save(game))
+
+
+def restore_file(game, path, now=None):
+    with open(path, "rb") as f:
+        restore(game, f.read(), now)
+
+
+# --- Self-check ---
+def _fingerprint(game):
+    # Everything that decides how the run goes on, as plain values
+    snake = game.snake
+    board = game.board
+    return (
+        list(snake.body),
+        snake.direction,
+        snake.new_direction,
+        list(snake.queued_turns),
+        snake.grow,
+        snake.alive,
+        snake.wrap_mode,
+        game.score,
+        game.move_delay,
+        game.last_move_time,
+        game.star_end_time,
+        game.apples_eaten_count,
+        game.rock_milestone,
+        sorted(game.bombs),
+        sorted(r.position for r in game.rocks if r.active),
+        # An inactive item's position is leftover; restore() clears it
+        [
+            (i.active, i.position if i.active else None)
+            for i in (getattr(game, name) for name in ITEMS)
+        ],
+        game.rng.getstate(),
+        list(board.counts),
+        list(board.free),
+        list(board.corners),
+    )
+
+
+def main(games):
+    # The autopilot plays long enough games (eating every kind of item)
+    # for bombs, rocks, stars and cookies to all come into play
+    pilot = autopilot.Autopilot(targets=ITEMS)
+    sizes = []
+    saves = []
+    restores = []
+    checked = 0
+    for seed in range(games):
+        pilot.reset()
+        game = engine.GameState(seed=seed)
+        other = engine.GameState()
+        for _ in range(CHECK_TICKS):
+            action = pilot(game)
+
+            started = time.perf_counter()
+            data = save(game)
+            saves.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            restore(other, data)
+            restores.append(time.perf_counter() - started)
+            sizes.append(len(data))
+
+            # Both must go the same way from here
+            game.step(action)
+            other.step(action)
+            if _fingerprint(game) != _fingerprint(other):
+                print(f"seed {seed}: restored game went a different way")
+                sys.exit(1)
+            checked += 1
+            if not game.snake.alive:
+                break
+        print(
+            f"seed {seed}: score {game.score}, {len(game.bombs)} bombs, "
+            f"{sum(r.active for r in game.rocks)} rocks"
+        )
+    for label, values in (("save", saves), ("restore", restores)):
+        values.sort()
+        print(
+            f"{label:8} p50 {values[len(values) // 2] * 1e6:.1f} us, "
+            f"p99 {values[int(len(values) * 0.99)] * 1e6:.1f} us"
+        )
+    print(f"{checked} ticks checked, snapshots {min(sizes)}-{max(sizes)} bytes")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,125 @@
+"""
+Steady-state steps and frames should allocate next to nothing: the board
+grids are arrays, entities are slotted and pooled, and the draw path
+reuses cached sprites, text and layers. tracemalloc checks both the
+memory kept after each step or frame and the most held at once while it
+ran.
+"""
+
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import benchmark  # noqa: E402
+import engine  # noqa: E402
+
+WARMUP = 200
+MEASURED = 1000
+
+# Bytes per step or frame: what may stay allocated on average (a growing
+# snake keeps its new head cells, pygame keeps spare Rects), and the most
+# held at once during one (a step's event list and new head; a frame's
+# dirty tile sets and the rects handed to the display)
+MAX_KEPT_PER_STEP = 64
+MAX_TRANSIENT_PER_STEP = 512
+MAX_KEPT_PER_FRAME = 64
+MAX_TRANSIENT_PER_FRAME = 8_192
+
+
+def measure(run_once, count):
+    """(bytes kept per call, most bytes held at once during any one call)."""
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        transient = 0
+        for _ in range(count):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            run_once()
+            _, peak = tracemalloc.get_traced_memory()
+            transient = max(transient, peak - before)
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (end - start) / count, transient
+
+
+def follow_cycle(game, next_dir):
+    """Steps the game along a Hamiltonian cycle, so the snake never dies."""
+
+    def step():
+        game.step(next_dir[game.snake.body[0]])
+
+    return step
+
+
+def test_engine_step_allocations():
+    game = engine.GameState(seed=1)
+    step = follow_cycle(
+        game, benchmark.board_cycle(game.board.width, game.board.height)
+    )
+    for _ in range(WARMUP):
+        step()
+
+    kept, transient = measure(step, MEASURED)
+
+    assert game.snake.alive
+    assert kept <= MAX_KEPT_PER_STEP
+    assert transient <= MAX_TRANSIENT_PER_STEP
+
+
+def test_frame_allocations():
+    pygame = pytest.importorskip("pygame")
+    import main
+    import render
+
+    main.init()
+    surface = main.game_surface
+    game = main.Game(seed=1)
+    step = follow_cycle(
+        game, benchmark.board_cycle(game.board.width, game.board.height)
+    )
+    font = main.fonts.get("comicsansms", 30, bold=True)
+    static_layer = pygame.Surface((main.VIRTUAL_WIDTH, main.VIRTUAL_HEIGHT)).convert()
+    static_layer.blit(main.build_background(False), (0, 0))
+    dirty = render.DirtyRenderer(
+        main.VIRTUAL_WIDTH, main.VIRTUAL_HEIGHT, main.GRID_SIZE
+    )
+    dirty.set_background(static_layer)
+    frames = 0
+
+    def frame():
+        # A gameplay frame as main() draws it at 60 fps, with a logic tick
+        # every few frames
+        nonlocal frames
+        frames += 1
+        if frames % 4 == 0:
+            step()
+        alpha = (frames % 4) / 4
+        dirty.restore(surface)
+        dirty.mark(game.apple.draw(surface))
+        dirty.mark(game.cookie.draw(surface))
+        dirty.mark(game.banana.draw(surface))
+        dirty.mark(game.star.draw(surface))
+        dirty.mark_all(game.snake.draw(surface, alpha))
+        dirty.mark(
+            main.text_cache.blit_number(
+                surface, font, "Score: ", game.score, main.COLOR_TEXT, (20, 20)
+            )
+        )
+        dirty.present(main.presenter)
+
+    for _ in range(WARMUP):
+        frame()
+
+    kept, transient = measure(frame, MEASURED)
+
+    assert game.snake.alive
+    assert kept <= MAX_KEPT_PER_FRAME
+    assert transient <= MAX_TRANSIENT_PER_FRAME
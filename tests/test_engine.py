@@ -0,0 +1,253 @@
+"""
+The rules of the headless engine, pinned to how the original pygame game
+played: what each item scores and does, the star's wrap-around, bombs,
+rocks, walls and the snake's own body.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+
+# The snake starts on (10..13, 10) heading right, on the default board
+HEAD = (engine.GRID_WIDTH // 2, engine.GRID_HEIGHT // 2)
+AHEAD = (HEAD[0] + 1, HEAD[1])
+
+
+def new_game():
+    """A seeded game with nothing on the board but the snake."""
+    game = engine.GameState(seed=0)
+    game.apple.despawn()
+    return game
+
+
+def put(game, item, x, y):
+    """Moves an item (or a new bomb) onto (x, y)."""
+    item.despawn()
+    game.board.place(x, y, item)
+    item.position = (x, y)
+    item.active = True
+    if item.kind == "bomb":
+        game.bombs[item.position] = item
+    return item
+
+
+def put_rock(game, x, y):
+    rock = game.rock_cls(game.board)
+    rock.position = (x, y)
+    rock.footprint = [(x, y), (x + 1, y), (x, y + 1), (x + 1, y + 1)]
+    for spot in rock.footprint:
+        game.board.place(*spot, rock)
+    rock.active = True
+    game.rocks.append(rock)
+    return rock
+
+
+def head(game):
+    return game.board.xy(game.snake.body[0])
+
+
+def grow(game, amount):
+    """Lengthens the snake by amount, one cell per step, heading on."""
+    for _ in range(amount):
+        game.snake.grow = True
+        game.step()
+
+
+def test_start():
+    game = new_game()
+    snake = game.snake
+    assert [game.board.xy(cell) for cell in snake.body] == [
+        HEAD,
+        (HEAD[0] - 1, HEAD[1]),
+        (HEAD[0] - 2, HEAD[1]),
+        (HEAD[0] - 3, HEAD[1]),
+    ]
+    assert snake.direction == engine.RIGHT
+    assert game.score == 0
+    assert game.move_delay == engine.START_MOVE_DELAY
+
+
+def test_apple_grows_scores_and_speeds_up():
+    game = new_game()
+    put(game, game.apple, *AHEAD)
+
+    events = game.step()
+
+    assert engine.EVENT_EAT in events
+    assert game.score == 10
+    assert game.apples_eaten_count == 1
+    assert game.move_delay == engine.START_MOVE_DELAY - engine.DELAY_DECREMENT
+    # A new apple appears somewhere free, and the snake grows on its next move
+    assert game.apple.active and game.apple.position != AHEAD
+    assert len(game.snake.body) == 4
+    game.apple.despawn()
+    game.step()
+    assert len(game.snake.body) == 5
+
+
+def test_speed_bottoms_out():
+    game = new_game()
+    game.move_delay = engine.MIN_MOVE_DELAY + 1
+    put(game, game.apple, *AHEAD)
+    game.step()
+    assert game.move_delay == engine.MIN_MOVE_DELAY
+
+
+def test_every_tenth_apple_brings_bonuses_and_bombs():
+    game = new_game()
+    game.apples_eaten_count = engine.APPLES_FOR_EVENT - 1
+    put(game, game.apple, *AHEAD)
+    version = game.static_version
+
+    game.step()
+
+    assert game.cookie.active
+    assert game.banana.active
+    assert len(game.bombs) == engine.BOMBS_PER_EVENT
+    assert game.static_version > version
+
+
+def test_banana_and_cookie_score_without_growing():
+    game = new_game()
+    put(game, game.banana, *AHEAD)
+    events = game.step()
+    assert engine.EVENT_BONUS in events
+    assert game.score == 20
+    assert not game.banana.active
+
+    put(game, game.cookie, head(game)[0] + 1, head(game)[1])
+    events = game.step()
+    assert engine.EVENT_BONUS in events
+    assert game.score == 70
+    assert not game.cookie.active
+
+    game.step()
+    assert len(game.snake.body) == 4
+
+
+def test_star_wraps_the_edges_until_it_runs_out():
+    game = new_game()
+    put(game, game.star, *AHEAD)
+
+    events = game.step()
+
+    assert engine.EVENT_POWERUP in events
+    assert game.star_end_time == game.now + engine.STAR_DURATION
+    assert not game.star.active
+    # Through the right wall and in on the left
+    while head(game)[0] < engine.GRID_WIDTH - 1:
+        game.step()
+    game.step()
+    assert game.snake.alive
+    assert head(game) == (0, HEAD[1])
+    assert game.snake.wrap_mode
+
+    # Once it is over the walls are back
+    events = game.step(now=game.star_end_time)
+    assert engine.EVENT_POWERUP_END in events
+    assert not game.snake.wrap_mode
+    game.step(engine.UP)
+    game.step(engine.LEFT)
+    assert head(game) == (0, HEAD[1] - 1)
+    events = game.step()
+    assert engine.EVENT_CRASH in events
+    assert not game.snake.alive
+
+
+def test_bomb_blows_off_the_tail():
+    game = new_game()
+    grow(game, 4)
+    assert len(game.snake.body) == 8
+    bomb = put(game, game.item_cls("bomb", game.board), head(game)[0] + 1, HEAD[1])
+
+    events = game.step()
+
+    assert engine.EVENT_EXPLODE in events
+    assert game.snake.alive
+    assert len(game.snake.body) == 8 - engine.BOMB_SHRINK
+    assert not bomb.active
+    assert not game.bombs
+    assert game.bomb_pool == [bomb]
+    assert game.score == 0
+
+
+def test_bomb_kills_a_short_snake():
+    game = new_game()
+    put(game, game.item_cls("bomb", game.board), *AHEAD)
+
+    events = game.step()
+
+    assert engine.EVENT_EXPLODE in events
+    assert not game.snake.alive
+
+
+def test_rock_ends_the_run():
+    game = new_game()
+    game.score = 150
+    put_rock(game, AHEAD[0], AHEAD[1] - 1)
+
+    events = game.step()
+
+    assert engine.EVENT_CRASH in events
+    assert not game.snake.alive
+    assert game.score == 150
+
+
+def test_a_rock_appears_every_200_points():
+    game = new_game()
+    game.score = engine.SCORE_FOR_ROCK - 10
+    put(game, game.apple, *AHEAD)
+    game.step()
+    assert game.score == engine.SCORE_FOR_ROCK
+    assert not game.rocks
+
+    game.apple.despawn()
+    game.step()
+
+    assert len(game.rocks) == 1 and game.rocks[0].active
+    assert game.rock_milestone == 2 * engine.SCORE_FOR_ROCK
+
+
+def test_wall_ends_the_run():
+    game = new_game()
+    while game.snake.alive:
+        events = game.step()
+    assert engine.EVENT_CRASH in events
+    assert head(game) == (engine.GRID_WIDTH - 1, HEAD[1])
+
+
+def test_moving_into_the_tail_ends_the_run():
+    # As in the original, the tail still blocks its cell on the move it
+    # would leave it
+    game = new_game()
+    for direction in (engine.DOWN, engine.LEFT, engine.UP):
+        game.step(direction)
+    assert not game.snake.alive
+
+
+def test_turns():
+    game = new_game()
+    snake = game.snake
+    # Straight back into the neck is ignored
+    assert not snake.turn(engine.LEFT)
+    # Two quick turns both land, one per tick
+    assert snake.turn(engine.DOWN)
+    assert snake.turn(engine.LEFT)
+    game.step()
+    assert head(game) == (HEAD[0], HEAD[1] + 1)
+    game.step()
+    assert head(game) == (HEAD[0] - 1, HEAD[1] + 1)
+
+
+def test_a_seed_replays_the_same_run():
+    games = [engine.GameState(seed=7), engine.GameState(seed=7)]
+    for game in games:
+        for tick in range(200):
+            game.step(engine.DIRECTIONS[tick // 5 % 4] if tick % 5 == 0 else None)
+    a, b = games
+    assert list(a.snake.body) == list(b.snake.body)
+    assert a.score == b.score
+    assert a.apple.position == b.apple.position
@@ -0,0 +1,117 @@
+"""
+The arena server over loopback TCP: client mirrors kept up to date by
+snapshots and deltas, only the owner steering, and a bad message costing
+the sender its connection.
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine  # noqa: E402
+import netplay  # noqa: E402
+from replay import read_varint, write_varint  # noqa: E402
+
+SEEDS = (0, 1, 2, 3)
+SECONDS = 1.5
+# Long enough for the server to handle what a client just sent
+SETTLE = 0.1
+
+
+def join_message(arena_id, seed=None):
+    join = bytearray(b"J")
+    write_varint(join, arena_id)
+    write_varint(join, 0 if seed is None else seed + 1)
+    return netplay.frame(bytes(join))
+
+
+async def connect(port, arena_id=0, seed=None):
+    """A bare client joined to an arena; (reader, writer, arena id)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(join_message(arena_id, seed))
+    snapshot = await netplay.read_frame(reader)
+    assert snapshot[:1] == b"S"
+    joined, _ = read_varint(snapshot, 1)
+    return reader, writer, joined
+
+
+async def close(*writers):
+    for writer in writers:
+        writer.close()
+    await asyncio.gather(*(w.wait_closed() for w in writers), return_exceptions=True)
+
+
+def test_mirrors_match_the_server():
+    async def run():
+        server = netplay.ArenaServer(report_seconds=0)
+        port = await server.start_serving(port=0)
+        clients = [netplay.LoopbackClient(random.Random(seed)) for seed in SEEDS]
+        tasks = [
+            asyncio.create_task(c.run("127.0.0.1", port, seed=seed))
+            for c, seed in zip(clients, SEEDS)
+        ]
+        await asyncio.sleep(SECONDS)
+        # Stop ticking and let the clients read what is in flight
+        server.driver.cancel()
+        await asyncio.sleep(SETTLE)
+        arenas = dict(server.arenas)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await server.stop()
+        return clients, arenas, server.ticks
+
+    clients, arenas, ticks = asyncio.run(run())
+    assert ticks > 0
+    assert len({c.arena_id for c in clients}) == len(SEEDS)
+    for client in clients:
+        assert client.ticks > 0
+        assert client.matches(arenas[client.arena_id])
+
+
+def test_only_the_owner_steers():
+    async def run():
+        server = netplay.ArenaServer(report_seconds=0)
+        port = await server.start_serving(port=0)
+        _, owner, arena_id = await connect(port, seed=0)
+        _, watcher, joined = await connect(port, arena_id)
+        assert joined == arena_id
+        snake = server.arenas[arena_id].game.snake
+
+        up = netplay.frame(b"T" + bytes([engine.DIRECTION_CODES[engine.UP]]))
+        watcher.write(up)
+        await asyncio.sleep(SETTLE)
+        watched = (snake.direction, snake.new_direction)
+        owner.write(up)
+        await asyncio.sleep(SETTLE)
+        steered = (snake.direction, snake.new_direction)
+
+        await close(owner, watcher)
+        await server.stop()
+        return watched, steered
+
+    watched, steered = asyncio.run(run())
+    assert watched == (engine.RIGHT, engine.RIGHT)
+    assert engine.UP in steered
+
+
+def test_bad_join_drops_the_client(capsys):
+    async def run():
+        server = netplay.ArenaServer(report_seconds=0)
+        port = await server.start_serving(port=0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        # The seed's varint is cut off
+        writer.write(netplay.frame(b"J\x00\x80"))
+        closed = await asyncio.wait_for(reader.read(), timeout=1)
+        arenas = len(server.arenas)
+        await close(writer)
+        await server.stop()
+        return closed, arenas
+
+    closed, arenas = asyncio.run(run())
+    assert closed == b""
+    assert arenas == 0
+    assert "Warning: dropping client" in capsys.readouterr().out
@@ -0,0 +1,99 @@
+"""
+A recorded run played back headlessly must end exactly where the original
+did, turns, clock jumps (pause/resume, dropped backlogs) and all.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import engine  # noqa: E402
+import replay  # noqa: E402
+import tournament  # noqa: E402
+
+SEEDS = (0, 1, 2, 3)
+MAX_TICKS = 1500
+
+
+def record(seed):
+    """Plays a short greedy run with some clock jumps; (game, replay bytes)."""
+    game = engine.GameState(seed=12345)
+    game.reset(5000, seed=seed)
+    rng = random.Random(seed)
+    recorder = replay.Recorder(game, seed)
+    for _ in range(MAX_TICKS):
+        if not game.snake.alive:
+            break
+        if rng.random() < 0.01:
+            game.last_move_time = int(game.last_move_time) + rng.randrange(5000)
+        action = tournament.greedy(game, rng)
+        if rng.random() < 0.02:
+            action = rng.choice(engine.DIRECTIONS)
+        if action is not None:
+            game.snake.turn(action)
+        recorder.before_step(game)
+        game.step()
+    return game, recorder.finish(game)
+
+
+def state(game):
+    snake = game.snake
+    return (
+        list(snake.body),
+        snake.direction,
+        snake.alive,
+        game.score,
+        game.apples_eaten_count,
+        [(i.active, i.position) for i in (game.apple, game.banana, game.cookie)],
+        sorted(game.bombs),
+        sorted(r.position for r in game.rocks if r.active),
+        game.rng.getstate(),
+        list(game.board.free),
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_playback_matches_the_run(seed):
+    game, data = record(seed)
+    played = replay.Replay.parse(data).play()
+    assert state(played) == state(game)
+
+
+def test_replay_is_compact():
+    _, data = record(0)
+    # A few bytes per turn, not per tick
+    assert len(data) < MAX_TICKS
+
+
+def test_a_different_score_is_caught():
+    _, data = record(1)
+    parsed = replay.Replay.parse(data)
+    delta, code, score = parsed.records[-1]
+    parsed.records[-1] = (delta, code, score + 10)
+    with pytest.raises(replay.ReplayError, match="scored"):
+        parsed.play()
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b"PNG\x00\x01", "not a replay"),
+        (replay.MAGIC + bytes([replay.VERSION + 1]), "version"),
+        (replay.MAGIC + bytes([replay.VERSION, 0x80]), "truncated"),
+        (replay.MAGIC + bytes([replay.VERSION, 1, 27, 20, 0x07]), "code"),
+        (replay.MAGIC + bytes([replay.VERSION, 1, 27, 20, 0x08]), "end record"),
+    ],
+)
+def test_bad_data_is_rejected(data, message):
+    with pytest.raises(replay.ReplayError, match=message):
+        replay.Replay.parse(data)
+
+
+def test_cut_off_replay_is_rejected():
+    _, data = record(2)
+    with pytest.raises(replay.ReplayError):
+        replay.Replay.parse(data[:-1])
@@ -0,0 +1,80 @@
+"""
+A game restored from a snapshot must carry on exactly as the saved one
+would have: same moves, same spawns, same rng.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import autopilot  # noqa: E402
+import engine  # noqa: E402
+import snapshot  # noqa: E402
+
+SEEDS = (0, 1, 2)
+MAX_TICKS = 600
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_restored_game_plays_out_the_same(seed):
+    # The autopilot goes for every kind of item, so bombs, rocks, stars
+    # and cookies come into play
+    pilot = autopilot.Autopilot(targets=snapshot.ITEMS)
+    game = engine.GameState(seed=seed)
+    other = engine.GameState()
+    for _ in range(MAX_TICKS):
+        if not game.snake.alive:
+            break
+        action = pilot(game)
+        snapshot.restore(other, snapshot.save(game))
+        assert snapshot._fingerprint(other) == snapshot._fingerprint(game)
+        game.step(action)
+        other.step(action)
+        assert snapshot._fingerprint(other) == snapshot._fingerprint(game)
+
+
+def test_restore_into_a_used_game():
+    game = engine.GameState(seed=3)
+    data = snapshot.save(game)
+    for tick in range(300):
+        game.step(engine.DIRECTIONS[tick // 7 % 4] if tick % 7 == 0 else None)
+    fresh = engine.GameState(seed=3)
+    snapshot.restore(game, data)
+    assert snapshot._fingerprint(game) == snapshot._fingerprint(fresh)
+
+
+def test_now_shifts_the_clock():
+    game = engine.GameState(seed=0)
+    game.step()
+    game.star_end_time = game.now + engine.STAR_DURATION
+    data = snapshot.save(game)
+    other = engine.GameState()
+    version = other.static_version
+
+    snapshot.restore(other, data, now=game.now + 10_000)
+
+    assert other.now == game.now + 10_000
+    assert other.last_move_time == game.last_move_time + 10_000
+    assert other.star_end_time == game.star_end_time + 10_000
+    assert other.static_version > version
+
+
+def test_wrong_board_is_rejected():
+    data = snapshot.save(engine.GameState(seed=0))
+    with pytest.raises(snapshot.SnapshotError, match="board"):
+        snapshot.restore(engine.GameState(width=30, height=20), data)
+
+
+@pytest.mark.parametrize("cut", [1, 100, snapshot.HEADER.size + 1])
+def test_cut_off_snapshot_is_rejected(cut):
+    data = snapshot.save(engine.GameState(seed=0))
+    with pytest.raises(snapshot.SnapshotError, match="truncated"):
+        snapshot.restore(engine.GameState(), data[:-cut])
+
+
+def test_not_a_snapshot():
+    with pytest.raises(snapshot.SnapshotError, match="not a snapshot"):
+        snapshot.restore(engine.GameState(), b"SNKR" + bytes(200))
@@ -0,0 +1,306 @@
+"""
+Plays many headless games of a bot policy across worker processes and
+reports score, length and survival statistics.
+
+A policy is a callable policy(game, rng) -> direction (or None to keep
+going straight), called once before every tick with the engine.GameState
+and a random.Random of its own. If the name resolves to a class, each
+game gets a fresh instance, so policies can keep state between ticks.
+Workers import the policy by name: one of POLICIES, or "module:attr" for
+anything importable.
+
+Game i of a tournament is seeded with seed + i, so any single game can be
+re-run on its own and a tournament gives the same results with any
+number of workers. Seeds are handed out in chunks, and each finished
+game is appended to the results file (one JSON object per line) as soon
+as its chunk comes back.
+
+Usage:
+    python tournament.py greedy --games 10000 --out results.jsonl
+    python tournament.py mybots:Hunter --workers 8 --max-ticks 20000
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import autopilot
+import engine
+
+DEFAULT_GAMES = 1000
+DEFAULT_CHUNK = 25
+# A game still running after this many ticks is stopped and counted as
+# survived, so a policy that circles forever can't stall the tournament
+DEFAULT_MAX_TICKS = 10_000
+# Chunks queued per worker, enough to keep every process busy
+CHUNKS_IN_FLIGHT = 4
+
+
+# --- Built-in Policies ---
+def straight(game, rng):
+    """Never turns; a baseline for how long doing nothing lasts."""
+    return None
+
+
+def random_turns(game, rng):
+    """Turns at random now and then, like the batch engine benchmark."""
+    if rng.random() < 0.3:
+        return rng.choice(engine.DIRECTIONS)
+    return None
+
+
+def greedy(game, rng):
+    """
+    Takes whichever safe neighbouring cell is closest to the apple. Looks
+    one move ahead only, so it walks into dead ends.
+    """
+    snake = game.snake
+    board = game.board
+    w, h = board.width, board.height
+    hx, hy = board.xy(snake.body[0])
+    ax, ay = game.apple.position
+    dx0, dy0 = snake.direction
+    options = list(engine.DIRECTIONS)
+    rng.shuffle(options)
+    best = None
+    for dx, dy in options:
+        if (dx, dy) == (-dx0, -dy0):
+            continue
+        nx, ny = hx + dx, hy + dy
+        if snake.wrap_mode:
+            nx %= w
+            ny %= h
+        elif not (0 <= nx < w and 0 <= ny < h):
+            continue
+        if snake.cell_counts[ny * w + nx]:
+            continue
+        hit = board.entity_at(nx, ny)
+        if hit is not None and hit.kind in ("bomb", "rock"):
+            continue
+        ddx, ddy = abs(nx - ax), abs(ny - ay)
+        if snake.wrap_mode:
+            ddx, ddy = min(ddx, w - ddx), min(ddy, h - ddy)
+        if best is None or ddx + ddy < best[0]:
+            best = (ddx + ddy, (dx, dy))
+    return best[1] if best else None
+
+
+POLICIES = {
+    "straight": straight,
+    "random": random_turns,
+    "greedy": greedy,
+    "autopilot": autopilot.Autopilot,
+}
+
+
+def resolve_policy(name):
+    """Returns a factory that makes one policy callable per game."""
+    if name in POLICIES:
+        policy = POLICIES[name]
+    else:
+        module_name, _, attr = name.partition(":")
+        if not attr:
+            raise ValueError(
+                f"unknown policy {name!r} (use one of {', '.join(POLICIES)} or module:attr)"
+            )
+        policy = getattr(importlib.import_module(module_name), attr)
+    if isinstance(policy, type):
+        return policy
+    return lambda: policy
+
+
+# --- Playing ---
+def play_game(policy, seed, max_ticks, width, height):
+    game = engine.GameState(seed=seed, width=width, height=height)
+    # Separate stream so the policy's choices don't shift item spawns
+    rng = random.Random((seed << 1) | 1)
+    snake = game.snake
+    ticks = 0
+    while snake.alive and ticks < max_ticks:
+        game.step(policy(game, rng))
+        ticks += 1
+    return {
+        "seed": seed,
+        "score": game.score,
+        "length": len(snake.body),
+        "ticks": ticks,
+        "alive": snake.alive,
+    }
+
+
+def play_chunk(policy_name, seeds, max_ticks, width, height):
+    """Worker entry point: plays one chunk of games and returns their results."""
+    make_policy = resolve_policy(policy_name)
+    return [play_game(make_policy(), seed, max_ticks, width, height) for seed in seeds]
+
+
+def run(
+    policy_name,
+    games,
+    seed=0,
+    workers=None,
+    chunk=DEFAULT_CHUNK,
+    max_ticks=DEFAULT_MAX_TICKS,
+    width=engine.GRID_WIDTH,
+    height=engine.GRID_HEIGHT,
+    on_results=None,
+):
+    """
+    Plays the games and returns every result, in seed order. on_results is
+    called with each chunk's results as it finishes. workers=0 plays in
+    this process (handy under a profiler).
+    """
+    resolve_policy(policy_name)  # Fail here rather than in every worker
+    chunks = [
+        range(start, min(start + chunk, seed + games))
+        for start in range(seed, seed + games, chunk)
+    ]
+    results = []
+
+    def collect(batch):
+        results.extend(batch)
+        if on_results is not None:
+            on_results(batch)
+
+    if workers == 0:
+        for seeds in chunks:
+            collect(play_chunk(policy_name, seeds, max_ticks, width, height))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as pool:
+            limit = workers * CHUNKS_IN_FLIGHT
+            pending = set()
+            queue = iter(chunks)
+            while True:
+                for seeds in queue:
+                    pending.add(
+                        pool.submit(
+                            play_chunk, policy_name, seeds, max_ticks, width, height
+                        )
+                    )
+                    if len(pending) >= limit:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+    results.sort(key=lambda r: r["seed"])
+    return results
+
+
+# --- Reporting ---
+def summarize(results, elapsed):
+    scores = [r["score"] for r in results]
+    lengths = [r["length"] for r in results]
+    ticks = [r["ticks"] for r in results]
+    return {
+        "games": len(results),
+        "seconds": elapsed,
+        "games_per_sec": len(results) / elapsed if elapsed > 0 else float("inf"),
+        "ticks_per_sec": sum(ticks) / elapsed if elapsed > 0 else float("inf"),
+        "score_mean": statistics.fmean(scores),
+        "score_median": statistics.median(scores),
+        "score_max": max(scores),
+        "length_mean": statistics.fmean(lengths),
+        "length_max": max(lengths),
+        "ticks_mean": statistics.fmean(ticks),
+        "survival_rate": sum(r["alive"] for r in results) / len(results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Snake bot tournament")
+    parser.add_argument("policy", help=f"one of {', '.join(POLICIES)} or module:attr")
+    parser.add_argument("--games", type=int, default=DEFAULT_GAMES)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes (default: one per CPU, 0 to play in-process)",
+    )
+    parser.add_argument(
+        "--chunk", type=int, default=DEFAULT_CHUNK, help="games per work unit"
+    )
+    parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS)
+    parser.add_argument("--board", metavar="WxH", help="board size in cells")
+    parser.add_argument(
+        "--out", metavar="PATH", help="append each game's result as JSON lines"
+    )
+    args = parser.parse_args()
+    try:
+        resolve_policy(args.policy)
+    except (ImportError, AttributeError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    if args.chunk < 1:
+        parser.error("--chunk must be at least 1")
+    width, height = engine.GRID_WIDTH, engine.GRID_HEIGHT
+    if args.board:
+        try:
+            width, height = (int(v) for v in args.board.lower().split("x"))
+        except ValueError:
+            parser.error(f"--board {args.board!r} is not a size like 40x30")
+        side = engine.MIN_BOARD_SIDE
+        if width < side or height < side:
+            parser.error(f"--board must be at least {side}x{side}")
+
+    out = open(args.out, "a") if args.out else None
+    finished = 0
+
+    def stream(batch):
+        nonlocal finished
+        finished += len(batch)
+        if out is not None:
+            for result in batch:
+                out.write(json.dumps(result) + "\n")
+            out.flush()
+        print(f"\r{finished}/{args.games} games", end="", flush=True)
+
+    started = time.perf_counter()
+    try:
+        results = run(
+            args.policy,
+            args.games,
+            seed=args.seed,
+            workers=args.workers,
+            chunk=args.chunk,
+            max_ticks=args.max_ticks,
+            width=width,
+            height=height,
+            on_results=stream,
+        )
+    finally:
+        if out is not None:
+            out.close()
+    stats = summarize(results, time.perf_counter() - started)
+
+    print()
+    workers = args.workers if args.workers is not None else os.cpu_count()
+    print(
+        f"{args.policy}: {stats['games']} games on {workers or 'no'} workers "
+        f"in {stats['seconds']:.2f}s"
+    )
+    print(
+        f"  {stats['games_per_sec']:,.1f} games/sec, {stats['ticks_per_sec']:,.0f} ticks/sec"
+    )
+    print(
+        f"  score  mean {stats['score_mean']:.1f}  median {stats['score_median']:g}  "
+        f"max {stats['score_max']}"
+    )
+    print(f"  length mean {stats['length_mean']:.1f}  max {stats['length_max']}")
+    print(
+        f"  ticks  mean {stats['ticks_mean']:.0f}  survived {stats['survival_rate']:.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()